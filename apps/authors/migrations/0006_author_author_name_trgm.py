@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:49
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+INDEX = django.contrib.postgres.indexes.GinIndex(fields=['name'], name='author_name_trgm', opclasses=['gin_trgm_ops'])
+
+
+# pg_trgm operator classes are PostgreSQL only, other databases only record the index in the state
+def add_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.add_index(apps.get_model('authors', 'Author'), INDEX)
+
+
+def remove_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.remove_index(apps.get_model('authors', 'Author'), INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authors', '0005_author_authors_aut_name_989e50_idx'),
+    ]
+
+    operations = [
+        # pg_trgm provides gin_trgm_ops and the word similarity operators; skipped on other databases
+        TrigramExtension(),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[migrations.AddIndex(model_name='author', index=INDEX)],
+            database_operations=[migrations.RunPython(add_index, remove_index)],
+        ),
+    ]
@@ -1,5 +1,12 @@
-from django.db import models
+from collections import namedtuple
+
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+from django.db.models import Count
+
+from apps.common.cache_utils import cached_method
 
 
 def get_author_photo_upload_path(instance, filename):
@@ -15,14 +22,71 @@ class Author(models.Model):
 
     class Meta:
         ordering = ["name"]
+        indexes = [
+            models.Index(fields=["name", "id"]),
+            # Fuzzy name matching in the trigram search backend
+            GinIndex(fields=["name"], name="author_name_trgm", opclasses=["gin_trgm_ops"]),
+        ]
 
     def __str__(self) -> str:
         return self.name
 
+    def save(self, *args, **kwargs):
+        # Signal handlers write search outbox events, commit them together with the row
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     @property
+    @cached_method()
     def books_count(self) -> int:
         """
         Count the number of books by this author
-        Using simple property instead of cached_method as properties don't work well with method decorators
+        Cached per author, book signals invalidate the author:<id> tag the result is stored under
         """
         return self.books.count()
+
+
+class AuthorListRow(namedtuple("AuthorListRow", ["id", "name", "country", "photo", "books_count"])):
+    """
+    Compact projection of an Author holding only the columns rendered by authors_index.html.
+    The book count is annotated in the same query instead of being counted per row.
+    """
+    __slots__ = ()
+
+    FIELDS = ("id", "name", "country", "photo", "books_count")
+    # Unique listing order, served by the (name, id) index
+    ORDERING = ("name", "id")
+
+    @classmethod
+    def values(cls, authors=None):
+        authors = Author.objects.all() if authors is None else authors
+        return authors.annotate(books_count=Count("books")).values_list(*cls.FIELDS)
+
+    @classmethod
+    def from_rows(cls, rows):
+        return [cls._make(row) for row in rows]
+
+    @classmethod
+    def cursor_key(cls, row):
+        """Ordering values of a raw row, used by CursorPaginator"""
+        return tuple(row[cls.FIELDS.index(field)] for field in cls.ORDERING)
+
+    @property
+    def photo_url(self):
+        return default_storage.url(self.photo) if self.photo else ""
+
+
+class AuthorChoice(namedtuple("AuthorChoice", ["id", "name"])):
+    """Compact projection of an Author used to fill author select inputs"""
+    __slots__ = ()
+
+    FIELDS = ("id", "name")
+
+    @classmethod
+    def values(cls, authors=None):
+        authors = Author.objects.all() if authors is None else authors
+        return authors.values_list(*cls.FIELDS)
+
+    @classmethod
+    def from_rows(cls, rows):
+        return [cls._make(row) for row in rows]
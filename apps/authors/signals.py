@@ -1,42 +1,44 @@
-from django.db.models.signals import post_save, post_delete
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
-from django.core.cache import cache
 
-from apps.common.cache_utils import invalidate_cache
+from apps.common.cache_utils import invalidate_tags
+from apps.common.search_outbox import enqueue_author
+from apps.common.search_service import SEARCH_INDEX_TAG
 from .models import Author
 
 
-@receiver(post_save, sender=Author)
-def author_save_handler(sender, instance, **kwargs):
-    """
-    Invalidate author cache when an author is saved or updated
-    """
-    # Invalidate individual author cache
-    invalidate_cache("author", instance.id)
-    
-    # Invalidate authors index page cache
-    cache.delete("authors_index:all")
-    
-    # Invalidate full authors list cache used in forms
-    cache.delete("authors:all")
-    
-    # Books associated with this author might need to be refreshed
-    cache.delete("books_index:all")
+@receiver(pre_save, sender=Author)
+def author_pre_save_handler(sender, instance, **kwargs):
+    # Remember the previous name, a rename must reach the search documents of every book
+    if instance.pk and not kwargs.get("raw"):
+        instance._previous_name = (
+            Author.objects.filter(pk=instance.pk).values_list("name", flat=True).first()
+        )
 
 
+@receiver(post_save, sender=Author)
 @receiver(post_delete, sender=Author)
-def author_delete_handler(sender, instance, **kwargs):
+def author_change_handler(sender, instance, **kwargs):
     """
-    Invalidate author cache when an author is deleted
+    Invalidate everything depending on an author when it is saved, updated or deleted,
+    once the change is committed so a concurrent reader cannot re-cache the previous row
     """
-    # Invalidate individual author cache
-    invalidate_cache("author", instance.id)
-    
-    # Invalidate authors index page cache
-    cache.delete("authors_index:all")
-    
-    # Invalidate full authors list cache used in forms
-    cache.delete("authors:all")
-    
-    # Books associated with this author might need to be refreshed
-    cache.delete("books_index:all")
+    tags = (
+        # The author itself and values derived from it (book details show the author name)
+        f"author:{instance.id}",
+        # Authors index pages and the authors list used in forms
+        "authors_index",
+        "authors",
+        # Book listing rows and search results show the author name
+        "books_index",
+        SEARCH_INDEX_TAG,
+    )
+    transaction.on_commit(lambda: invalidate_tags(*tags))
+
+
+@receiver(post_save, sender=Author)
+def author_rename_handler(sender, instance, created, **kwargs):
+    previous_name = getattr(instance, "_previous_name", None)
+    if not created and previous_name is not None and previous_name != instance.name:
+        enqueue_author(instance.id)
@@ -1 +1,88 @@
-# Tests will be implemented here
+from datetime import date
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from apps.authors.models import Author
+from apps.books.models import Book
+
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class AuthorsIndexQueryCountTests(TestCase):
+    """
+    Pin the number of queries issued by the authors listing so per-row
+    lookups (e.g. author.books_count) do not creep back into the page.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(25):
+            author = Author.objects.create(name=f"Author {i:02d}", country="Chile")
+            for j in range(i % 3):
+                Book.objects.create(
+                    author=author,
+                    name=f"Book {i:02d}-{j}",
+                    summary="Summary",
+                    published_at=date(2000 + j, 1, 1),
+                )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_page_is_built_from_count_and_one_annotated_query(self):
+        # One (estimated) count for the pager and one keyset SELECT for the page rows
+        cursor = None
+        for _ in range(3):
+            params = {"cursor": cursor} if cursor else {}
+            with self.assertNumQueries(2):
+                response = self.client.get(reverse("authors:index"), params)
+            self.assertEqual(response.status_code, 200)
+            cursor = response.context["authors"].next_cursor
+
+    def test_cursors_walk_the_whole_listing_in_order(self):
+        names, cursor = [], None
+        while True:
+            params = {"cursor": cursor} if cursor else {}
+            page = self.client.get(reverse("authors:index"), params).context["authors"]
+            names.extend(author.name for author in page)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+
+        self.assertEqual(names, [f"Author {i:02d}" for i in range(25)])
+
+        previous = self.client.get(reverse("authors:index"), {"cursor": page.previous_cursor}).context["authors"]
+        self.assertEqual([author.name for author in previous], names[10:20])
+        self.assertTrue(previous.has_previous())
+
+    def test_book_counts_come_from_the_annotation(self):
+        response = self.client.get(reverse("authors:index"))
+
+        counts = {author.name: author.books_count for author in response.context["authors"]}
+        self.assertEqual(counts["Author 00"], 0)
+        self.assertEqual(counts["Author 01"], 1)
+        self.assertEqual(counts["Author 02"], 2)
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_cached_page_needs_no_queries(self):
+        cache.clear()
+        cursor = self.client.get(reverse("authors:index")).context["authors"].next_cursor
+        self.client.get(reverse("authors:index"), {"cursor": cursor})
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("authors:index"), {"cursor": cursor})
+        self.assertEqual(len(response.context["authors"]), 10)
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_new_book_refreshes_cached_count(self):
+        cache.clear()
+        self.client.get(reverse("authors:index"))
+        author = Author.objects.get(name="Author 00")
+        with self.captureOnCommitCallbacks(execute=True):
+            Book.objects.create(author=author, name="Fresh", summary="Summary", published_at=date(2020, 1, 1))
+
+        response = self.client.get(reverse("authors:index"))
+        counts = {row.name: row.books_count for row in response.context["authors"]}
+        self.assertEqual(counts["Author 00"], 1)
@@ -1,35 +1,31 @@
 from datetime import datetime
 
-from django.core.paginator import Paginator
 from django.db.models import Sum
 from django.db.models.functions import Coalesce
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.http import require_POST
 
-from .models import Author
+from apps.common.http_cache import conditional_page
+from apps.common.pagination import CursorPaginator
+
+from .models import Author, AuthorListRow
 
 CURRENT_YEAR = datetime.now().year
 
 
 def authors_index(request):
-    from django.core.cache import cache
-    
-    # For index views, we use a simpler cache key without query params to avoid excessive cache entries
-    cache_key = "authors_index:all"
-    author_list = cache.get(cache_key)
-    
-    if author_list is None:
-        author_list = Author.objects.all()
-        cache.set(cache_key, author_list, 300)  # Cache for 5 minutes
-    
-    paginator = Paginator(author_list, 10)
-
-    page_number = request.GET.get("page")
-    authors = paginator.get_page(page_number)
+    # Keyset pages cached per cursor, deep pages cost the same as the first one
+    paginator = CursorPaginator(
+        AuthorListRow.values(), AuthorListRow.ORDERING, 10,
+        row_key=AuthorListRow.cursor_key, cache_namespace="authors_index",
+    )
+    authors = paginator.get_page(request.GET.get("cursor"))
+    authors.object_list = AuthorListRow.from_rows(authors.object_list)
 
     return render(request, "authors/authors_index.html", {"authors": authors})
 
 
+@conditional_page(lambda request, author_id: [f"author:{author_id}"])
 def authors_show(request, author_id):
     from apps.common.cache_utils import get_from_cache_or_db
 
@@ -87,11 +83,12 @@ def authors_create(request):
             Author.objects.create(**author_data)
             return redirect("authors:index")
 
-    author_list = Author.objects.all()
-    paginator = Paginator(author_list, 10)
-
-    page_number = request.GET.get("page")
-    authors = paginator.get_page(page_number)
+    paginator = CursorPaginator(
+        AuthorListRow.values(), AuthorListRow.ORDERING, 10,
+        row_key=AuthorListRow.cursor_key, cache_namespace="authors_index",
+    )
+    authors = paginator.get_page(request.GET.get("cursor"))
+    authors.object_list = AuthorListRow.from_rows(authors.object_list)
 
     return render(
         request,
@@ -0,0 +1,125 @@
+import random
+import statistics
+import string
+import time
+from datetime import date
+
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from apps.authors.models import Author
+from apps.books.models import Book
+from apps.common.search_service import search_service
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the on-the-fly SearchVector search with the stored, GIN-indexed search_vector '
+        'and the pg_trgm fuzzy search on a synthetic catalogue. All synthetic rows are rolled back at the end.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--books',
+            type=int,
+            default=100000,
+            help='Synthetic books to create (default: 100000)',
+        )
+        parser.add_argument(
+            '--authors',
+            type=int,
+            default=1000,
+            help='Synthetic authors to create (default: 1000)',
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=20,
+            help='Search terms to time for each approach (default: 20)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Random seed for the synthetic data (default: 42)',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Full-text search needs PostgreSQL.')
+
+        rng = random.Random(options['seed'])
+        vocabulary = [self._word(rng) for _ in range(5000)]
+
+        with transaction.atomic():
+            started = time.perf_counter()
+            self._populate(rng, vocabulary, options['authors'], options['books'])
+            self.stdout.write(
+                f'Created {options["books"]} books in {time.perf_counter() - started:.1f}s'
+            )
+
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE authors_author')
+                cursor.execute('ANALYZE books_book')
+
+            terms = rng.sample(vocabulary, options['queries'])
+            approaches = [
+                ('on-the-fly SearchVector', self._on_the_fly),
+                ('stored search_vector', lambda term: search_service.database_search(term, 'fulltext')),
+                # Terms typed without their last letter, which only the fuzzy backend matches
+                ('pg_trgm word similarity', lambda term: search_service.database_search(term[:-1], 'trigram')),
+            ]
+            for label, search in approaches:
+                self._report(label, search, terms)
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('Synthetic data rolled back'))
+
+    def _on_the_fly(self, term):
+        """The search as it was done before the stored column existed"""
+        vector = SearchVector('summary', 'name', 'author__name')
+        return Book.objects.annotate(search=vector).filter(search=SearchQuery(term))
+
+    def _report(self, label, search, terms):
+        # One search results page: the paginator count plus the first 10 rows
+        timings = []
+        for term in terms:
+            queryset = search(term)
+            started = time.perf_counter()
+            queryset.count()
+            list(queryset[:10])
+            timings.append((time.perf_counter() - started) * 1000)
+
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        plan = search(terms[0])[:10].explain().splitlines()
+        self.stdout.write(
+            f'{label}: median {statistics.median(timings):.1f}ms, p95 {p95:.1f}ms, max {timings[-1]:.1f}ms'
+        )
+        for line in plan[:4]:
+            self.stdout.write(f'    {line}')
+
+    def _populate(self, rng, vocabulary, author_count, book_count):
+        authors = Author.objects.bulk_create(
+            Author(name=f'{self._word(rng).title()} {self._word(rng).title()}', country='Synthetic')
+            for _ in range(author_count)
+        )
+
+        batch = []
+        for i in range(book_count):
+            batch.append(Book(
+                author=rng.choice(authors),
+                name=' '.join(rng.choices(vocabulary, k=3)).title(),
+                summary=' '.join(rng.choices(vocabulary, k=60)),
+                published_at=date(rng.randint(1950, 2024), 1, 1),
+            ))
+            if len(batch) == 5000:
+                Book.objects.bulk_create(batch)
+                batch = []
+        Book.objects.bulk_create(batch)
+
+    @staticmethod
+    def _word(rng):
+        return ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9)))
@@ -1,10 +1,14 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+
 from django.core.management.base import BaseCommand
-from apps.common.search_service import search_service
+from apps.common.search_service import SearchService, book_document, search_service
 from apps.books.models import Book
 
 
 class Command(BaseCommand):
-    help = 'Initialize ElasticSearch index and sync existing books'
+    help = 'Initialize ElasticSearch: bulk load all books into a new index and swap the books alias to it'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -12,31 +16,126 @@ class Command(BaseCommand):
             action='store_true',
             help='Force reindex even if ElasticSearch is not available',
         )
+        parser.add_argument(
+            '--es-url',
+            help='ElasticSearch URL to use instead of the configured host (e.g. a local stub)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Documents per _bulk request (default: 500)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Concurrent _bulk requests (default: 4)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Rows fetched per database round trip (default: 2000)',
+        )
+        parser.add_argument(
+            '--keep-old',
+            action='store_true',
+            help='Keep the indices previously behind the alias instead of deleting them',
+        )
 
     def handle(self, *args, **options):
-        if not search_service.es_available and not options['force']:
+        service = SearchService(es_url=options['es_url']) if options['es_url'] else search_service
+
+        es_reachable = service.ping()
+        if not es_reachable and not options['force']:
             self.stdout.write(
                 self.style.WARNING('ElasticSearch is not available. Skipping initialization.')
             )
             return
 
         self.stdout.write('Initializing ElasticSearch...')
-        
-        # Create index if it doesn't exist
-        search_service.create_index_if_not_exists()
-        
-        if search_service.es_available:
-            # Sync all existing books
-            books = Book.objects.select_related('author').all()
-            self.stdout.write(f'Syncing {books.count()} books...')
-            
-            for book in books:
-                search_service.index_book(book)
-            
+
+        if not es_reachable:
             self.stdout.write(
-                self.style.SUCCESS(f'Successfully synced {books.count()} books to ElasticSearch')
+                self.style.WARNING('ElasticSearch not available - no books synced')
             )
-        else:
+            return
+
+        index_name = service.create_versioned_index(bulk_load=True)
+        self.stdout.write(f'Loading books into {index_name}...')
+
+        # One query with the author joined, streamed instead of loaded at once
+        books = Book.objects.select_related('author').defer('search_vector').order_by('id').iterator(chunk_size=options['chunk_size'])
+        actions = (
+            {'_index': index_name, '_id': book.id, '_source': book_document(book)}
+            for book in books
+        )
+
+        started = time.perf_counter()
+        try:
+            indexed, failed = self._bulk_load(service.admin_client, actions, options['batch_size'], options['workers'])
+        except Exception:
+            # Do not leave the half-loaded index behind, the alias still points to the previous one
+            self._discard(service, index_name)
+            raise
+        elapsed = time.perf_counter() - started
+
+        rate = indexed / elapsed if elapsed > 0 else indexed
+        self.stdout.write(f'Indexed {indexed} books in {elapsed:.2f}s ({rate:.0f} docs/s)')
+
+        if failed:
+            self._discard(service, index_name)
             self.stdout.write(
-                self.style.WARNING('ElasticSearch not available - no books synced')
+                self.style.WARNING(f'{failed} books failed to index, {index_name} discarded and alias left unchanged')
             )
+            return
+
+        service.finish_bulk_load(index_name)
+        replaced = service.swap_alias(index_name)
+
+        if replaced and not options['keep_old']:
+            service.admin_client.indices.delete(index=','.join(replaced))
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully synced {indexed} books to ElasticSearch, alias now points to {index_name}')
+        )
+
+    def _discard(self, service, index_name):
+        """Delete an index that never made it behind the alias"""
+        try:
+            service.admin_client.indices.delete(index=index_name)
+        except Exception as e:
+            self.stdout.write(self.style.WARNING(f'Could not delete {index_name}, delete it by hand: {e}'))
+
+    def _bulk_load(self, es_client, actions, batch_size, workers):
+        """
+        Send actions as _bulk requests of batch_size from a pool of workers
+
+        Rows are read from the database on this thread (database connections
+        are per thread); only the HTTP requests run in the pool, with at most
+        two batches per worker in flight. Returns (indexed, failed) counts.
+        """
+        from elasticsearch.helpers import bulk
+
+        indexed = failed = 0
+        pending = set()
+
+        def collect(done):
+            nonlocal indexed, failed
+            for future in done:
+                ok, errors = future.result()
+                indexed += ok
+                failed += errors
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while batch := list(islice(actions, batch_size)):
+                pending.add(pool.submit(
+                    bulk, es_client, batch, chunk_size=batch_size, stats_only=True, raise_on_error=False
+                ))
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+            collect(wait(pending).done)
+
+        return indexed, failed
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Least
+
+from apps.books.models import MAX_POSITIVE_INT, Book
+from apps.common.cache_utils import invalidate_cache
+from apps.sales.models import Sale
+
+
+class Command(BaseCommand):
+    help = 'Reconcile the denormalized Book.total_sales counter against the Sale rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report drifted books without writing the corrected totals',
+        )
+
+    def handle(self, *args, **options):
+        sales_total = (
+            Sale.objects
+            .filter(book=OuterRef('pk'))
+            .values('book')
+            .annotate(total=Sum('sales'))
+            .values('total')
+        )
+        drifted = (
+            Book.objects
+            .annotate(
+                computed_total=Least(
+                    Coalesce(Subquery(sales_total, output_field=IntegerField()), 0),
+                    MAX_POSITIVE_INT,
+                )
+            )
+            .exclude(total_sales=F('computed_total'))
+            .only('id', 'name', 'total_sales')
+        )
+
+        fixed = 0
+        for book in drifted.iterator():
+            self.stdout.write(
+                f'Book {book.id} "{book.name}": stored {book.total_sales}, actual {book.computed_total}'
+            )
+            if options['dry_run']:
+                continue
+
+            Book.objects.filter(pk=book.pk).update(total_sales=book.computed_total)
+            invalidate_cache("book", book.id)
+            fixed += 1
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Dry run - no totals were changed'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Reconciled total_sales for {fixed} books'))
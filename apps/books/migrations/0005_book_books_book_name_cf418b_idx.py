@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authors', '0005_author_authors_aut_name_989e50_idx'),
+        ('books', '0004_alter_book_cover_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['name', 'id'], name='books_book_name_cf418b_idx'),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:47
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# The book row trigger rebuilds the vector whenever a searched column changes, and the
+# author trigger touches the author's books on rename so their vectors pick up the new name
+CREATE_TRIGGERS = """
+CREATE OR REPLACE FUNCTION books_book_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector(COALESCE(NEW.name, '')), 'A') ||
+        setweight(to_tsvector(COALESCE((SELECT name FROM authors_author WHERE id = NEW.author_id), '')), 'B') ||
+        setweight(to_tsvector(COALESCE(NEW.summary, '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER books_book_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, summary, author_id ON books_book
+    FOR EACH ROW EXECUTE FUNCTION books_book_search_vector_update();
+
+CREATE OR REPLACE FUNCTION authors_author_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    UPDATE books_book SET author_id = author_id WHERE author_id = NEW.id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER authors_author_search_vector_trigger
+    AFTER UPDATE OF name ON authors_author
+    FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+    EXECUTE FUNCTION authors_author_search_vector_update();
+
+UPDATE books_book SET name = name;
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER IF EXISTS authors_author_search_vector_trigger ON authors_author;
+DROP FUNCTION IF EXISTS authors_author_search_vector_update();
+DROP TRIGGER IF EXISTS books_book_search_vector_trigger ON books_book;
+DROP FUNCTION IF EXISTS books_book_search_vector_update();
+"""
+
+
+def run_on_postgresql(sql):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == "postgresql":
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authors', '0005_author_authors_aut_name_989e50_idx'),
+        ('books', '0005_book_books_book_name_cf418b_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='books_book_search__c24b82_gin'),
+        ),
+        migrations.RunPython(run_on_postgresql(CREATE_TRIGGERS), run_on_postgresql(DROP_TRIGGERS)),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:49
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+INDEX = django.contrib.postgres.indexes.GinIndex(fields=['name'], name='book_name_trgm', opclasses=['gin_trgm_ops'])
+
+
+# pg_trgm operator classes are PostgreSQL only, other databases only record the index in the state
+def add_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.add_index(apps.get_model('books', 'Book'), INDEX)
+
+
+def remove_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.remove_index(apps.get_model('books', 'Book'), INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authors', '0006_author_author_name_trgm'),
+        ('books', '0006_book_search_vector'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[migrations.AddIndex(model_name='book', index=INDEX)],
+            database_operations=[migrations.RunPython(add_index, remove_index)],
+        ),
+    ]
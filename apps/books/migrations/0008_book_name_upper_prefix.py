@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:51
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+INDEX = models.Index(
+    django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='text_pattern_ops'),
+    name='book_name_upper_prefix',
+)
+
+
+# Operator classes are PostgreSQL syntax, other databases only record the index in the state
+def add_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.add_index(apps.get_model('books', 'Book'), INDEX)
+
+
+def remove_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.remove_index(apps.get_model('books', 'Book'), INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authors', '0006_author_author_name_trgm'),
+        ('books', '0007_book_book_name_trgm'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[migrations.AddIndex(model_name='book', index=INDEX)],
+            database_operations=[migrations.RunPython(add_index, remove_index)],
+        ),
+    ]
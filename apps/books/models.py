@@ -1,8 +1,23 @@
-from django.db import models
+from collections import namedtuple
+
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest, Least, Upper
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
 
 from apps.authors.models import Author
 
+MAX_POSITIVE_INT = 2147483647
+
+# Delimiters search backends put around matched words in headlines, replaced by <mark> after escaping
+HEADLINE_START = "\x02"
+HEADLINE_STOP = "\x03"
+
 
 def get_book_cover_upload_path(instance, filename):
     return f"{settings.BOOK_COVERS_UPLOAD_PATH}{filename}"
@@ -17,21 +32,107 @@ class Book(models.Model):
 
     total_sales = models.PositiveIntegerField(default=0)
 
+    # Weighted name (A), author name (B) and summary (C) lexemes, kept up to date by
+    # database triggers (see migration 0006) so author renames are reflected too
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
         ordering = ["name"]
         indexes = [
             models.Index(fields=["author"]),
+            models.Index(fields=["name", "id"]),
+            GinIndex(fields=["search_vector"]),
+            # Fuzzy name matching in the trigram search backend
+            GinIndex(fields=["name"], name="book_name_trgm", opclasses=["gin_trgm_ops"]),
+            # Case-insensitive prefix matching (name__istartswith) for autocomplete
+            models.Index(OpClass(Upper("name"), name="text_pattern_ops"), name="book_name_upper_prefix"),
         ]
 
     def __str__(self) -> str:
         return self.name
 
+    def save(self, *args, **kwargs):
+        # Signal handlers write search outbox events, commit them together with the row
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def apply_sales_delta(self, delta):
+        """
+        Atomically shift the denormalized total_sales counter by delta.
+        The update runs as a single UPDATE ... SET total_sales = total_sales + delta,
+        clamped to the range of a PositiveIntegerField, so concurrent sale writes
+        never read-modify-write the book row.
+        """
+        if not delta:
+            return
+
+        Book.objects.filter(pk=self.pk).update(
+            total_sales=Least(Greatest(F("total_sales") + delta, 0), MAX_POSITIVE_INT)
+        )
+
     def recompute_total_sales(self):
         agg = self.yearly_sales.aggregate(total=models.Sum("sales"))
         total = agg.get("total") or 0
 
-        MAX_POSITIVE_INT = 2147483647
         total = min(total, MAX_POSITIVE_INT)
 
         self.total_sales = total
         self.save(update_fields=["total_sales"])
+
+
+class BookListRow(namedtuple("BookListRow", ["id", "name", "author_name", "year", "cover_image"])):
+    """
+    Compact projection of a Book holding only the columns rendered by books_index.html.
+    Plain tuples of these columns are what gets cached, rows are rebuilt from them without the ORM.
+    """
+    __slots__ = ()
+
+    FIELDS = ("id", "name", "author__name", "published_at__year", "cover_image")
+    # Unique listing order, served by the (name, id) index
+    ORDERING = ("name", "id")
+
+    @classmethod
+    def values(cls, books=None):
+        books = Book.objects.all() if books is None else books
+        return books.values_list(*cls.FIELDS)
+
+    @classmethod
+    def from_rows(cls, rows):
+        return [cls._make(row) for row in rows]
+
+    @classmethod
+    def cursor_key(cls, row):
+        """Ordering values of a raw row, used by CursorPaginator"""
+        return tuple(row[cls.FIELDS.index(field)] for field in cls.ORDERING)
+
+    @property
+    def cover_url(self):
+        return default_storage.url(self.cover_image) if self.cover_image else ""
+
+
+class BookSearchRow(namedtuple("BookSearchRow", BookListRow._fields + ("headline",))):
+    """
+    BookListRow plus a headline: an excerpt of the summary with the matched
+    words wrapped in HEADLINE_START / HEADLINE_STOP
+    """
+    __slots__ = ()
+
+    FIELDS = BookListRow.FIELDS + ("headline",)
+
+    cover_url = BookListRow.cover_url
+
+    @classmethod
+    def values(cls, books):
+        """books must be annotated with headline"""
+        return books.values_list(*cls.FIELDS)
+
+    @classmethod
+    def from_rows(cls, rows):
+        return [cls._make(row) for row in rows]
+
+    @property
+    def headline_html(self):
+        if not self.headline:
+            return ""
+        html = escape(self.headline).replace(HEADLINE_START, "<mark>").replace(HEADLINE_STOP, "</mark>")
+        return mark_safe(html)
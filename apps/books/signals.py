@@ -1,43 +1,62 @@
-from django.db.models.signals import post_save, post_delete
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
-from django.core.cache import cache
 
-from apps.common.cache_utils import invalidate_cache
-from apps.common.search_service import search_service
+from apps.common.cache_utils import invalidate_tags
+from apps.common.models import SearchOutbox
+from apps.common.search_outbox import enqueue_book
+from apps.common.search_service import SEARCH_INDEX_TAG
 from .models import Book
 
 
+@receiver(pre_save, sender=Book)
+def book_pre_save_handler(sender, instance, **kwargs):
+    # Remember the previous author so its book count is invalidated when a book is reassigned
+    if instance.pk and not kwargs.get("raw"):
+        instance._previous_author_id = (
+            Book.objects.filter(pk=instance.pk).values_list("author_id", flat=True).first()
+        )
+
+
+def invalidate_after_commit(*tags):
+    # Bumped once the row is committed, a concurrent reader could otherwise
+    # re-cache the previous row under the new generations
+    transaction.on_commit(lambda: invalidate_tags(*tags))
+
+
 @receiver(post_save, sender=Book)
 def book_save_handler(sender, instance, **kwargs):
-    # Invalidate individual book cache
-    invalidate_cache("book", instance.id)
-    
-    # Invalidate book counts for authors
-    invalidate_cache("method:books_count:Author", instance.author_id)
-    
-    # Invalidate book index page cache
-    cache.delete("books_index:all")
-    
-    # Invalidate book reviews cache
-    invalidate_cache("book_reviews", instance.id)
-    
-    # Sync with ElasticSearch
-    search_service.index_book(instance)
+    # Fixture loads (raw saves) may hold incomplete rows, init_elasticsearch indexes them afterwards
+    if kwargs.get("raw"):
+        return
+
+    invalidate_after_commit(
+        # The book itself and everything derived from it
+        f"book:{instance.id}",
+        # Book counts and totals shown for the author
+        f"author:{instance.author_id}",
+        f"author:{getattr(instance, '_previous_author_id', None) or instance.author_id}",
+        # Listing pages (author cards show how many books each author has)
+        "books_index",
+        "authors_index",
+        # Cached search results (the database backends see the change right away)
+        SEARCH_INDEX_TAG,
+    )
+
+    # Written in the same transaction, reindexed by the search outbox worker once it commits
+    enqueue_book(instance.id)
 
 
 @receiver(post_delete, sender=Book)
 def book_delete_handler(sender, instance, **kwargs):
-    # Invalidate individual book cache
-    invalidate_cache("book", instance.id)
-    
-    # Invalidate book counts for authors
-    invalidate_cache("method:books_count:Author", instance.author_id)
-    
-    # Invalidate book index page cache
-    cache.delete("books_index:all")
-    
-    # Invalidate book reviews cache
-    invalidate_cache("book_reviews", instance.id)
-    
-    # Remove from ElasticSearch
-    search_service.delete_book(instance.id)
+    invalidate_after_commit(
+        f"book:{instance.id}",
+        f"reviews-of:{instance.id}",
+        f"author:{instance.author_id}",
+        "books_index",
+        "authors_index",
+        SEARCH_INDEX_TAG,
+    )
+
+    # Removed from the search index by the search outbox worker
+    enqueue_book(instance.id, SearchOutbox.DELETE)
@@ -1 +1,230 @@
-# Tests will be implemented here
+import json
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from apps.authors.models import Author
+from apps.books.management.commands import init_elasticsearch
+from apps.books.models import Book
+from apps.common.cache_utils import get_generations
+from apps.common.models import SearchOutbox
+
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class StubElasticsearch:
+    """
+    Minimal in-process stand-in for the ElasticSearch endpoints used by
+    init_elasticsearch: index create/delete/settings/refresh, aliases and _bulk
+    """
+
+    def __init__(self, indices=(), aliases=None):
+        self.indices = {name: {} for name in indices}
+        self.aliases = dict(aliases or {})
+        self.alias_actions = []
+        self.bulk_requests = 0
+        self.lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_HEAD(self):
+                self.respond(*stub.handle("HEAD", self.path, b""))
+
+            def do_GET(self):
+                self.respond(*stub.handle("GET", self.path, b""))
+
+            def do_PUT(self):
+                self.respond(*stub.handle("PUT", self.path, self.read_body()))
+
+            def do_POST(self):
+                self.respond(*stub.handle("POST", self.path, self.read_body()))
+
+            def do_DELETE(self):
+                self.respond(*stub.handle("DELETE", self.path, b""))
+
+            def read_body(self):
+                return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+            def respond(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("X-Elastic-Product", "Elasticsearch")
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def handle(self, method, path, body):
+        path = path.split("?")[0].strip("/")
+        with self.lock:
+            if path == "":
+                return 200, {"version": {"number": "8.0.0"}}
+            if path == "_bulk":
+                return self.bulk(body)
+            if path == "_aliases":
+                for action in json.loads(body)["actions"]:
+                    self.alias_actions.append(action)
+                    (kind, args), = action.items()
+                    if kind == "add":
+                        self.aliases[args["alias"]] = args["index"]
+                    elif kind == "remove":
+                        self.aliases.pop(args["alias"], None)
+                    elif kind == "remove_index":
+                        self.indices.pop(args["index"], None)
+                return 200, {"acknowledged": True}
+            if path.startswith("_alias/"):
+                name = path.split("/", 1)[1]
+                if name not in self.aliases:
+                    return 404, {"error": "alias missing", "status": 404}
+                return 200, {self.aliases[name]: {"aliases": {name: {}}}}
+
+            name, _, action = path.partition("/")
+            if action in ("_settings", "_refresh"):
+                return 200, {"acknowledged": True}
+            if method == "PUT":
+                self.indices[name] = {}
+                return 200, {"acknowledged": True, "index": name}
+            if method == "DELETE":
+                for index in name.split(","):
+                    self.indices.pop(index, None)
+                return 200, {"acknowledged": True}
+            if name in self.indices or name in self.aliases:
+                return 200, {}
+            return 404, {"error": "index missing", "status": 404}
+
+    def bulk(self, body):
+        self.bulk_requests += 1
+        lines = body.decode().splitlines()
+        items = []
+        for action_line, source_line in zip(lines[::2], lines[1::2]):
+            meta = json.loads(action_line)["index"]
+            self.indices.setdefault(meta["_index"], {})[str(meta["_id"])] = json.loads(source_line)
+            items.append({"index": {"_index": meta["_index"], "_id": meta["_id"], "status": 201}})
+        return 200, {"took": 1, "errors": False, "items": items}
+
+
+class InitElasticsearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(name="Ursula K. Le Guin", country="USA")
+        for i in range(5):
+            Book.objects.create(author=author, name=f"Book {i}", summary="Summary", published_at=date(1970 + i, 1, 1))
+
+    def reindex(self, stub, **options):
+        out = StringIO()
+        call_command("init_elasticsearch", es_url=stub.url, batch_size=2, workers=2, stdout=out, **options)
+        return out.getvalue()
+
+    def test_bulk_loads_a_new_index_and_replaces_the_legacy_index(self):
+        with StubElasticsearch(indices=["books"]) as stub:
+            with self.assertNumQueries(1):
+                output = self.reindex(stub)
+
+        index_name = stub.aliases["books"]
+        self.assertTrue(index_name.startswith("books-"))
+        self.assertEqual(len(stub.indices[index_name]), 5)
+        self.assertEqual(stub.bulk_requests, 3)
+        book = Book.objects.first()
+        self.assertEqual(stub.indices[index_name][str(book.id)]["author_name"], "Ursula K. Le Guin")
+        # The concrete index is dropped in the same request that adds the alias
+        self.assertEqual(stub.alias_actions[0], {"remove_index": {"index": "books"}})
+        self.assertIn("docs/s", output)
+
+    def test_swaps_alias_and_deletes_previous_index(self):
+        with StubElasticsearch(indices=["books-old"], aliases={"books": "books-old"}) as stub:
+            self.reindex(stub)
+
+        self.assertNotEqual(stub.aliases["books"], "books-old")
+        self.assertNotIn("books-old", stub.indices)
+        self.assertEqual(stub.alias_actions[0], {"remove": {"index": "books-old", "alias": "books"}})
+
+    def test_keep_old_leaves_previous_index(self):
+        with StubElasticsearch(indices=["books-old"], aliases={"books": "books-old"}) as stub:
+            self.reindex(stub, keep_old=True)
+
+        self.assertIn("books-old", stub.indices)
+
+    def test_failed_load_deletes_the_new_index(self):
+        with StubElasticsearch(indices=["books-old"], aliases={"books": "books-old"}) as stub:
+            with mock.patch.object(init_elasticsearch.Command, "_bulk_load", side_effect=ConnectionError("ES went away")):
+                with self.assertRaises(ConnectionError):
+                    self.reindex(stub)
+
+        self.assertEqual(set(stub.indices), {"books-old"})
+        self.assertEqual(stub.aliases, {"books": "books-old"})
+
+
+@override_settings(CACHES=LOCMEM_CACHES, SEARCH_OUTBOX_ENABLED=True)
+class BookInvalidationTests(TestCase):
+    def test_tags_are_bumped_once_the_change_commits(self):
+        author = Author.objects.create(name="Octavia E. Butler", country="USA")
+        book = Book.objects.create(author=author, name="Kindred", summary="Summary", published_at=date(1979, 1, 1))
+        tags = [f"book:{book.id}", f"author:{author.id}", "books_index"]
+        before = get_generations(tags)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            book.name = "Kindred: A Novel"
+            book.save()
+            self.assertEqual(get_generations(tags), before)
+            # The search outbox event is written with the row, not after commit
+            self.assertTrue(SearchOutbox.objects.filter(object_id=book.id).exists())
+
+        after = get_generations(tags)
+        self.assertTrue(all(after[tag] != before[tag] for tag in tags))
+
+
+@override_settings(CACHES=LOCMEM_CACHES, SEARCH_BACKEND="trigram")
+class BooksAutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(name="Frank Herbert", country="USA")
+        for name in ["Dune Messiah", "Dune", "Children of Dune", "Dragon"]:
+            Book.objects.create(author=cls.author, name=name, summary="Summary", published_at=date(1965, 1, 1))
+
+    def setUp(self):
+        cache.clear()
+
+    def suggest(self, prefix):
+        return self.client.get(reverse("books:autocomplete"), {"q": prefix}).json()["results"]
+
+    def test_suggests_names_starting_with_the_prefix(self):
+        results = self.suggest("  DUne ")
+        self.assertEqual([book["name"] for book in results], ["Dune", "Dune Messiah"])
+        self.assertEqual(results[0]["author"], "Frank Herbert")
+        self.assertEqual(results[0]["url"], reverse("books:show", args=[Book.objects.get(name="Dune").id]))
+
+    def test_short_prefixes_are_not_searched(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest("d"), [])
+
+    def test_warm_prefix_is_served_from_cache_until_books_change(self):
+        self.suggest("dr")
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self.suggest("DR")), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Book.objects.create(author=self.author, name="Dreamer", summary="Summary", published_at=date(1970, 1, 1))
+        self.assertEqual([book["name"] for book in self.suggest("dr")], ["Dragon", "Dreamer"])
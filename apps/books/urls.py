@@ -6,6 +6,7 @@ app_name = "books"
 
 urlpatterns = [
     path("", views.books_index, name="index"),
+    path("autocomplete/", views.books_autocomplete, name="autocomplete"),
     path("create/", views.books_create, name="create"),
     path("<int:book_id>/", views.books_show, name="show"),
     path("<int:book_id>/update/", views.books_update, name="update"),
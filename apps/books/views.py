@@ -1,43 +1,46 @@
+import hashlib
+
 from django.contrib.postgres.search import SearchQuery, SearchVector
-from django.core.paginator import Paginator
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
 from django.utils import timezone
 from django.views.decorators.http import require_http_methods
 
-from apps.reviews.models import Review, ReviewUpvote
+from apps.authors.models import AuthorChoice
+from apps.reviews.models import ReviewUpvote, get_book_reviews
+from apps.common.cache_utils import get_cache_key, get_snapshot_or_build, get_tagged
+from apps.common.http_cache import conditional_page
+from apps.common.pagination import CursorPaginator
 from apps.common.utils import render_book_detail
-from apps.common.search_service import search_service
+from apps.common.search_service import SEARCH_INDEX_TAG, search_service
 
-from .models import Author, Book
+from .models import Author, Book, BookListRow, BookSearchRow
 
+# Prefixes shorter than this match too many books to be useful suggestions
+AUTOCOMPLETE_MIN_LENGTH = 2
+AUTOCOMPLETE_MAX_LENGTH = 50
+AUTOCOMPLETE_TTL = 60
 
-def books_index(request):
-    from django.core.cache import cache
 
+@conditional_page(lambda request: ["books_index", "authors", SEARCH_INDEX_TAG])
+def books_index(request):
     query = (request.GET.get("q") or "").strip()
 
     if query:
-        # Use the search service which handles ElasticSearch or database search
-        book_list = search_service.search_books(query, Book.objects.all())
+        # Only the requested page is fetched, in relevance order (ElasticSearch or database search)
+        books = search_service.search_page(query, request.GET.get("page"), 10)
+        books.object_list = BookSearchRow.from_rows(books.object_list)
     else:
-        cache_key = "books_index:all"
-        book_list = cache.get(cache_key)
-
-        if book_list is None:
-            book_list = Book.objects.all()
-
-            cache.set(cache_key, book_list, 300)
-
-    paginator = Paginator(book_list, 10)
-
-    page_number = request.GET.get("page")
-    books = paginator.get_page(page_number)
+        # Keyset pages cached per cursor, deep pages cost the same as the first one
+        paginator = CursorPaginator(
+            BookListRow.values(), BookListRow.ORDERING, 10,
+            row_key=BookListRow.cursor_key, cache_namespace="books_index",
+        )
+        books = paginator.get_page(request.GET.get("cursor"))
+        books.object_list = BookListRow.from_rows(books.object_list)
 
-    cache_key = "authors:all"
-    authors = cache.get(cache_key)
-    if authors is None:
-        authors = Author.objects.all()
-        cache.set(cache_key, authors, 300)
+    authors = AuthorChoice.from_rows(get_snapshot_or_build("authors:all", AuthorChoice.values, tags=["authors"]))
 
     return render(
         request,
@@ -53,37 +56,73 @@ def books_index(request):
     )
 
 
+@require_http_methods(["GET"])
+def books_autocomplete(request):
+    """
+    JSON suggestions for the search box, as the user types
+
+    Prefixes are normalized (case and whitespace) and their suggestions
+    cached in the two-tier cache, so popular prefixes are answered from the
+    worker's memory without touching ElasticSearch or the database. Any
+    book change moves the books_index generation and drops them.
+    """
+    prefix = " ".join((request.GET.get("q") or "").split()).lower()[:AUTOCOMPLETE_MAX_LENGTH]
+
+    suggestions = []
+    if len(prefix) >= AUTOCOMPLETE_MIN_LENGTH:
+        cache_key = f"books_autocomplete:{hashlib.sha1(prefix.encode()).hexdigest()}"
+        suggestions = get_snapshot_or_build(
+            cache_key, lambda: search_service.suggest(prefix), ttl=AUTOCOMPLETE_TTL, tags=["books_index"]
+        )
+
+    return JsonResponse({
+        "q": prefix,
+        "results": [
+            {"id": book_id, "name": name, "author": author_name, "url": reverse("books:show", args=[book_id])}
+            for book_id, name, author_name in suggestions
+        ],
+    })
+
+
+def book_page_tags(request, book_id):
+    """
+    Tags books_show depends on, known once the book and its review ids are cached
+
+    The cached book gives the author (its name is shown) and the cached
+    review ids give the review:<id> tags that upvotes bump.
+    """
+    entry = get_tagged(get_cache_key("book", book_id))
+    review_ids = get_tagged(f"book_reviews:{book_id}")
+    if entry is None or review_ids is None:
+        return None
+
+    book = entry[0]
+    return [
+        f"book:{book_id}",
+        f"author:{book.author_id}",
+        f"reviews-of:{book_id}",
+        *(f"review:{review_id}" for review_id in review_ids),
+    ]
+
+
+@conditional_page(book_page_tags)
 def books_show(request, book_id):
     from apps.common.cache_utils import get_from_cache_or_db
-    from django.core.cache import cache
 
     def fetch_book():
         try:
-            book = Book.objects.get(id=book_id)
-            book.recompute_total_sales()
-            return book
+            # The stored search vector is not rendered, keep it out of the cached object
+            return Book.objects.select_related("author").defer("search_vector").get(id=book_id)
         except Book.DoesNotExist:
             return None
 
-    book = get_from_cache_or_db("book", book_id, fetch_book)
+    # The page shows the author name, so the cached book also depends on its author
+    book = get_from_cache_or_db("book", book_id, fetch_book, tags=lambda b: [f"author:{b.author_id}"])
     if not book:
         return redirect("books:index")
 
 
-    reviews_cache_key = f"book_reviews:{book_id}"
-    reviews = None
-
-    if not request.user.is_authenticated:
-        reviews = cache.get(reviews_cache_key)
-
-    if reviews is None:
-        reviews = Review.objects.filter(book=book).prefetch_related("reviewupvotes", "user")
-
-        for review in reviews:
-            review.recompute_up_votes_count()
-
-        if not request.user.is_authenticated:
-            cache.set(reviews_cache_key, reviews, 300)
+    reviews = get_book_reviews(book.id)
 
     user_upvoted_review_ids = []
     if request.user.is_authenticated:
@@ -173,13 +212,13 @@ def books_create(request):
             Book.objects.create(**book_data)
             return redirect("books:index")
 
-    authors = Author.objects.all()
-    book_list = Book.objects.all()
-
-    paginator = Paginator(book_list, 10)
-
-    page_number = request.GET.get("page")
-    books = paginator.get_page(page_number)
+    authors = AuthorChoice.from_rows(get_snapshot_or_build("authors:all", AuthorChoice.values, tags=["authors"]))
+    paginator = CursorPaginator(
+        BookListRow.values(), BookListRow.ORDERING, 10,
+        row_key=BookListRow.cursor_key, cache_namespace="books_index",
+    )
+    books = paginator.get_page(request.GET.get("cursor"))
+    books.object_list = BookListRow.from_rows(books.object_list)
 
     return render(
         request,
@@ -1,74 +1,434 @@
-from django.core.cache import cache
+from django.core.cache import cache as shared_cache
 from functools import wraps
 import hashlib
+import json
+import math
+import random
+import time
+
+from apps.common import metrics
+from apps.common.tiered_cache import build_cache
+
+# In-process LRU in front of the shared cache, see apps.common.tiered_cache
+cache = build_cache(shared_cache)
 
 # Cache time in seconds (5 minutes)
 CACHE_TTL = 300
 
+# Stampede protection for get_from_cache_or_db
+# Seconds an expired value may still be served while a single request recomputes it
+STALE_TTL = 60
+# Seconds a recompute lock is held at most (guards against a crashed worker)
+LOCK_TTL = 10
+# Seconds a request waits for another request's recompute before computing itself
+LOCK_WAIT = 2.0
+LOCK_POLL_INTERVAL = 0.05
+# XFetch aggressiveness, higher values refresh earlier
+XFETCH_BETA = 1.0
+# Relative jitter applied to TTLs so keys written together do not expire together
+TTL_JITTER = 0.1
+
+# Version of the row layout stored by get_snapshot_or_build.
+# Bump it whenever the columns of a snapshot change so old entries are rebuilt instead of misread.
+SNAPSHOT_SCHEMA_VERSION = 1
+
 
 def get_cache_key(model_name, obj_id):
     """Generate a consistent cache key format"""
     return f"{model_name.lower()}:{obj_id}"
 
 
-def get_from_cache_or_db(model_name, obj_id, query_func):
+def get_generation_key(tag):
+    """Cache key holding the generation counter of a tag"""
+    return f"generation:{tag}"
+
+
+def get_generation(tag):
+    """
+    Get the current generation of a tag
+
+    A tag names something cached values depend on, either an entity
+    ("book:5", "author:2", "reviews-of:5") or a whole namespace
+    ("books_index"). Bumping the generation invalidates every value that
+    depends on the tag at once, the orphaned entries simply expire by TTL.
+    A missing counter is seeded from the clock so it never goes back to a
+    generation whose values may still be alive.
+    """
+    generation_key = get_generation_key(tag)
+    generation = cache.get(generation_key)
+
+    if generation is None:
+        generation = int(time.time() * 1000)
+        if not cache.add(generation_key, generation, None):
+            generation = cache.get(generation_key, generation)
+
+    return generation
+
+
+def get_generations(tags):
+    """
+    Get the current generation of several tags with a single round trip
+
+    Returns:
+        dict: Generation per tag
+    """
+    tags = list(dict.fromkeys(tags))
+    found = cache.get_many([get_generation_key(tag) for tag in tags]) if tags else {}
+
+    generations = {}
+    for tag in tags:
+        generation = found.get(get_generation_key(tag))
+        generations[tag] = generation if generation is not None else get_generation(tag)
+    return generations
+
+
+def bump_generation(tag):
+    """Invalidate everything depending on a tag in O(1) by moving it to a new generation"""
+    try:
+        cache.incr(get_generation_key(tag))
+    except ValueError:
+        # Counter missing, seeding it from the clock already moves past every old generation
+        get_generation(tag)
+
+
+def invalidate_tags(*tags):
+    """
+    Invalidate every cached value tagged with any of the given tags
+
+    Costs one INCR per tag no matter how many keys depend on it.
+    """
+    for tag in dict.fromkeys(tags):
+        bump_generation(tag)
+
+
+def get_tagged(cache_key):
+    """
+    Read a value written with set_tagged
+
+    The entry stores the generation of each tag it depends on; if any tag
+    moved on since the value was written the entry is treated as a miss.
+
+    Returns:
+        The cached value, or None on a miss or a stale entry
+    """
+    entry = cache.get(cache_key)
+
+    if not isinstance(entry, tuple) or len(entry) != 2:
+        return None
+
+    value, tag_generations = entry
+    if tag_generations and get_generations(tag_generations) != tag_generations:
+        return None
+
+    return value
+
+
+def set_tagged(cache_key, value, tag_generations, ttl=CACHE_TTL):
+    """
+    Store a value together with the generations of the tags it depends on
+
+    Args:
+        cache_key (str): Cache key of the value
+        value: Value to cache
+        tag_generations (dict): Generation per tag, read with get_generations
+            before the value was computed so a concurrent invalidation is not lost
+        ttl (int): Cache duration in seconds
+    """
+    cache.set(cache_key, tagged_entry(value, tag_generations), ttl)
+
+
+def tagged_entry(value, tag_generations):
+    """The exact object set_tagged stores, e.g. to measure what a value costs in the cache"""
+    return (value, dict(tag_generations))
+
+
+def jittered_ttl(ttl):
+    """Spread a TTL by +/- TTL_JITTER so keys written together expire at different times"""
+    return max(1, int(ttl * random.uniform(1 - TTL_JITTER, 1 + TTL_JITTER)))
+
+
+def _should_refresh(compute_time, expires_at):
+    """
+    XFetch probabilistic early expiration
+
+    Returns True once the entry is expired, and with a probability that grows
+    as expiry approaches (scaled by how long the value takes to compute), so
+    one request usually refreshes a hot key before it actually expires.
+    """
+    return time.time() - compute_time * XFETCH_BETA * math.log(1 - random.random()) >= expires_at
+
+
+def _acquire_lock(lock_key):
+    return cache.add(lock_key, 1, LOCK_TTL)
+
+
+def _release_lock(lock_key):
+    # Locks never enter the local tier, no invalidation broadcast needed
+    shared_cache.delete(lock_key)
+
+
+def get_from_cache_or_db(model_name, obj_id, query_func, tags=None, ttl=CACHE_TTL):
     """
     Try to get an object from cache, or query the database if not found
-    
+
+    Recomputation is single-flight: only the request holding a short lock runs
+    query_func, the others serve the stale value while it is still within
+    STALE_TTL, or wait up to LOCK_WAIT for the fresh one, and stop waiting as
+    soon as the lock is released without a value to read. Hot keys are
+    refreshed slightly before they expire (XFetch) and TTLs are jittered.
+    Lock waits, early refreshes and stale serves are counted in apps.common.metrics.
+
     Args:
         model_name (str): Model name for cache key
-        obj_id: Object ID 
+        obj_id: Object ID
         query_func (callable): Function to execute if cache miss
-        
+        tags (list or callable): Extra tags the object depends on, or a function
+            returning them from the queried object. The object is always tagged
+            with its own key, so invalidate_cache(model_name, obj_id) drops it.
+        ttl (int): Seconds the object is considered fresh
+
     Returns:
         The cached or database-queried object
     """
     cache_key = get_cache_key(model_name, obj_id)
-    cached_obj = cache.get(cache_key)
+    lock_key = f"lock:{cache_key}"
+    entry = get_tagged(cache_key)
+    if not (isinstance(entry, tuple) and len(entry) == 3):
+        entry = None
+
+    if entry is not None:
+        value, compute_time, expires_at = entry
+
+        if not _should_refresh(compute_time, expires_at):
+            metrics.increment("cache.hit")
+            return value
+
+        if not _acquire_lock(lock_key):
+            # Someone else is already refreshing, keep serving what we have
+            metrics.increment("cache.stale_served" if time.time() >= expires_at else "cache.hit")
+            return value
+
+        metrics.increment("cache.refresh" if time.time() >= expires_at else "cache.early_refresh")
+    else:
+        metrics.increment("cache.miss")
 
-    if cached_obj is None:
+        if not _acquire_lock(lock_key):
+            metrics.increment("cache.lock_wait")
+            started = time.monotonic()
+            deadline = started + LOCK_WAIT
+
+            while time.monotonic() < deadline:
+                time.sleep(LOCK_POLL_INTERVAL)
+                lock_held = shared_cache.get(lock_key) is not None
+                entry = get_tagged(cache_key)
+                if entry is not None:
+                    metrics.observe("cache.lock_wait", time.monotonic() - started)
+                    return entry[0]
+                if not lock_held:
+                    # Released without caching a value (None result, error, or an
+                    # invalidation rejected it), waiting longer will not produce one
+                    break
+            else:
+                # The lock holder is too slow or died, compute without it
+                metrics.increment("cache.lock_wait_timeout")
+
+            metrics.observe("cache.lock_wait", time.monotonic() - started)
+            return query_func()
+
+    try:
+        static_tags = [cache_key] + (list(tags) if tags and not callable(tags) else [])
+        tag_generations = get_generations(static_tags)
+
+        started = time.monotonic()
         db_obj = query_func()
+        compute_time = time.monotonic() - started
+        metrics.observe("cache.recompute", compute_time)
 
         if db_obj is not None:
-            cache.set(cache_key, db_obj, CACHE_TTL)
+            if callable(tags):
+                tag_generations.update(get_generations(tags(db_obj)))
+
+            fresh_ttl = jittered_ttl(ttl)
+            set_tagged(
+                cache_key,
+                (db_obj, compute_time, time.time() + fresh_ttl),
+                tag_generations,
+                fresh_ttl + STALE_TTL,
+            )
 
         return db_obj
+    finally:
+        _release_lock(lock_key)
+
+
+def get_many_from_cache_or_db(model_name, ids, bulk_loader, ttl=CACHE_TTL):
+    """
+    Batched get_from_cache_or_db: fetch several objects with one MGET and one query
+
+    Every entry is tagged with its own key, so invalidate_cache(model_name, id)
+    drops it. Entries are validated with a single MGET of their tag generations,
+    and all misses are loaded with one bulk_loader call.
+
+    Args:
+        model_name (str): Model name for cache keys
+        ids (iterable): Object IDs
+        bulk_loader (callable): Receives the list of missing IDs and returns
+            {id: object}, typically from a single id__in query
+        ttl (int): Cache duration in seconds
+
+    Returns:
+        dict: Objects by ID, IDs that do not exist are left out
+    """
+    keys = {get_cache_key(model_name, obj_id): obj_id for obj_id in ids}
+    if not keys:
+        return {}
+
+    entries = {
+        key: entry for key, entry in cache.get_many(list(keys)).items()
+        if isinstance(entry, tuple) and len(entry) == 2
+    }
+    current = get_generations(tag for _, tag_generations in entries.values() for tag in tag_generations)
+
+    found = {}
+    for key, (value, tag_generations) in entries.items():
+        if all(current.get(tag) == generation for tag, generation in tag_generations.items()):
+            found[keys[key]] = value
+
+    missing = {key: obj_id for key, obj_id in keys.items() if obj_id not in found}
+    metrics.increment("cache.hit", len(found))
+    metrics.increment("cache.miss", len(missing))
+
+    if missing:
+        tag_generations = get_generations(missing)
+        loaded = bulk_loader(list(missing.values()))
+
+        cache.set_many(
+            {
+                key: (loaded[obj_id], {key: tag_generations[key]})
+                for key, obj_id in missing.items()
+                if obj_id in loaded
+            },
+            jittered_ttl(ttl),
+        )
+        found.update(loaded)
+
+    return found
+
 
-    return cached_obj
+def get_snapshot_or_build(cache_key, build_rows, ttl=CACHE_TTL, schema_version=SNAPSHOT_SCHEMA_VERSION, tags=()):
+    """
+    Get a compact row snapshot from cache, or build and cache it if not found
+
+    Only plain tuples of column values are stored, never model instances or
+    QuerySets, so the cached value is small and does not drag ORM state
+    through pickle. The value is stored together with its schema version.
+
+    Args:
+        cache_key (str): Cache key of the snapshot
+        build_rows (callable): Returns an iterable of row tuples (e.g. a values_list QuerySet)
+        ttl (int): Cache duration in seconds
+        schema_version (int): Layout version the caller expects
+        tags (iterable): Tags the snapshot depends on
+
+    Returns:
+        list: The rows as tuples
+    """
+    cached = get_tagged(cache_key)
+
+    if isinstance(cached, tuple) and len(cached) == 2 and cached[0] == schema_version:
+        return cached[1]
+
+    tag_generations = get_generations(tags)
+    rows = [tuple(row) for row in build_rows()]
+    set_tagged(cache_key, (schema_version, rows), tag_generations, ttl)
+    return rows
 
 
 def invalidate_cache(model_name, obj_id):
-    """Delete a specific object from cache"""
-    cache_key = get_cache_key(model_name, obj_id)
-    cache.delete(cache_key)
+    """Invalidate a specific object and everything tagged with it"""
+    invalidate_tags(get_cache_key(model_name, obj_id))
+
+
+def _stable_arg(value):
+    """JSON fallback giving model instances, dates and sets a stable representation"""
+    if hasattr(value, "_meta") and hasattr(value, "pk"):
+        return f"{value._meta.label_lower}:{value.pk}"
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=repr)
+    return repr(value)
+
+
+def make_args_key(args, kwargs):
+    """Stable hash of call arguments (independent of kwargs order and object identity)"""
+    payload = json.dumps([args, kwargs], sort_keys=True, default=_stable_arg, separators=(",", ":"))
+    return hashlib.sha1(payload.encode()).hexdigest()
 
 
-def cached_method(ttl=CACHE_TTL):
+def cached_method(ttl=CACHE_TTL, negative_ttl=None, tags=None):
     """
     Decorator for caching method results
-    
+
+    Results are tagged with the instance ("<class>:<id>"), so
+    invalidate_cache("<class>", id) drops them. None results are cached too
+    (negative caching), optionally for a shorter negative_ttl. Hits and
+    misses are counted per function in apps.common.metrics as
+    cached_method.<Class>.<method>.hit/miss.
+
+    Args:
+        ttl (int): Cache duration in seconds for this function
+        negative_ttl (int): Cache duration for None results, defaults to ttl
+        tags (callable): Receives the instance and returns extra tags the result depends on
+
     Usage:
         @cached_method()
         def get_something(self, key):
             # Expensive operation
             return result
+
+        # Works on properties as well, apply it below @property
+        @property
+        @cached_method(ttl=60)
+        def books_count(self):
+            return self.books.count()
     """
     def decorator(func):
+        metric_name = f"cached_method.{func.__qualname__}"
+
+        def get_key(instance, args, kwargs):
+            instance_id = getattr(instance, 'pk', None)
+            cache_key = f"method:{func.__module__}.{func.__qualname__}:{instance_id}"
+            if args or kwargs:
+                cache_key += ":" + make_args_key(args, kwargs)
+            return cache_key
+
         @wraps(func)
         def wrapped(instance, *args, **kwargs):
-            instance_id = getattr(instance, 'id', 'unknown')
-            cache_key = f"method:{func.__name__}:{instance.__class__.__name__}:{instance_id}"
+            cache_key = get_key(instance, args, kwargs)
 
-            if args or kwargs:
-                args_str = str(args)
-                kwargs_str = str(sorted(kwargs.items()))
-                hash_obj = hashlib.md5((args_str + kwargs_str).encode())
-                cache_key += ":" + hash_obj.hexdigest()
-
-            result = cache.get(cache_key)
-            if result is None:
-                result = func(instance, *args, **kwargs)
-                cache.set(cache_key, result, ttl)
+            # Results are boxed in a 1-tuple so a cached None is told apart from a miss
+            boxed = get_tagged(cache_key)
+            if boxed is not None:
+                metrics.increment(f"{metric_name}.hit")
+                return boxed[0]
+
+            metrics.increment(f"{metric_name}.miss")
+            instance_tags = [get_cache_key(instance.__class__.__name__, getattr(instance, 'pk', None))]
+            if tags is not None:
+                instance_tags.extend(tags(instance))
+            tag_generations = get_generations(instance_tags)
+
+            result = func(instance, *args, **kwargs)
+
+            result_ttl = negative_ttl if result is None and negative_ttl is not None else ttl
+            set_tagged(cache_key, (result,), tag_generations, result_ttl)
             return result
+
+        def invalidate(instance, *args, **kwargs):
+            """Drop the cached result of one call"""
+            cache.delete(get_key(instance, args, kwargs))
+
+        wrapped.invalidate = invalidate
         return wrapped
     return decorator
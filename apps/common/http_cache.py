@@ -0,0 +1,83 @@
+"""
+Conditional GET for read pages
+
+A page's ETag is a hash of the generation counters of the cache tags it
+depends on (see apps.common.cache_utils), so it changes exactly when a
+signal invalidates something the page shows. The ETag is computed before
+the view runs, from cache reads only, and a matching If-None-Match is
+answered with 304 Not Modified without loading the page data or rendering
+the template.
+
+Pages embed the user's name and a CSRF token, so the user and the CSRF
+cookie are part of the ETag, responses are Cache-Control: private and
+Vary on Cookie: browsers revalidate every time, and nginx never shares a
+page between users.
+"""
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from apps.common import metrics
+from apps.common.cache_utils import get_generations
+
+
+def page_etag(request, tags):
+    """
+    ETag of a page depending on the given cache tags, for the requesting user
+
+    Returns:
+        str: The ETag, or None when the page must not be validated (no
+            shared cache to hold the generations, unknown dependencies, or
+            flash messages waiting to be shown)
+    """
+    if not settings.USE_CACHE or tags is None or len(get_messages(request)):
+        return None
+
+    generations = get_generations(tags)
+    user = request.user.pk if request.user.is_authenticated else None
+    payload = json.dumps(
+        [sorted(generations.items()), user, request.COOKIES.get(settings.CSRF_COOKIE_NAME, "")],
+        separators=(",", ":"),
+    )
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def conditional_page(tags):
+    """
+    Decorator adding generation based ETags and 304 handling to a read view
+
+    Args:
+        tags (callable): Receives the view arguments (request, *args,
+            **kwargs) and returns the tags the page depends on, or None
+            when they cannot be known without querying the database
+
+    Usage:
+        @conditional_page(lambda request, author_id: [f"author:{author_id}"])
+        def authors_show(request, author_id):
+            ...
+    """
+    def decorator(view):
+        def etag(request, *args, **kwargs):
+            return page_etag(request, tags(request, *args, **kwargs))
+
+        conditional_view = condition(etag_func=etag)(view)
+
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if response.status_code == 304:
+                metrics.increment("http.not_modified")
+
+            patch_vary_headers(response, ("Cookie",))
+            if response.has_header("ETag"):
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return wrapped
+
+    return decorator
@@ -0,0 +1,72 @@
+import pickle
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from apps.authors.models import Author, AuthorChoice, AuthorListRow
+from apps.books.models import Book, BookListRow
+from apps.common.cache_utils import SNAPSHOT_SCHEMA_VERSION, get_generations, tagged_entry
+from apps.common.pagination import CursorPaginator
+
+PAGE_SIZE = 10
+
+
+class Command(BaseCommand):
+    help = 'Report the memory saved per key by caching row snapshots instead of pickled QuerySets'
+
+    def handle(self, *args, **options):
+        books_pages = CursorPaginator(
+            BookListRow.values(), BookListRow.ORDERING, PAGE_SIZE,
+            row_key=BookListRow.cursor_key, cache_namespace="books_index",
+        )
+        authors_pages = CursorPaginator(
+            AuthorListRow.values(), AuthorListRow.ORDERING, PAGE_SIZE,
+            row_key=AuthorListRow.cursor_key, cache_namespace="authors_index",
+        )
+        # (cache key, legacy QuerySet in the same order, rows the snapshot stores, tags of the entry)
+        snapshots = [
+            # A page snapshot holds PAGE_SIZE + 1 rows, the extra one tells whether a next page exists
+            (books_pages.page_key(), Book.objects.order_by(*BookListRow.ORDERING), lambda: books_pages._fetch(None), ()),
+            (authors_pages.page_key(), Author.objects.order_by(*AuthorListRow.ORDERING), lambda: authors_pages._fetch(None), ()),
+            ("authors:all", Author.objects.all(), AuthorChoice.values, ["authors"]),
+        ]
+
+        redis_conn = self._get_redis_connection()
+
+        total_saved = 0
+        for cache_key, legacy_queryset, build_rows, tags in snapshots:
+            rows = [tuple(row) for row in build_rows()]
+            # The legacy value for the same rows: a pickled QuerySet carries its result cache
+            legacy = legacy_queryset[:len(rows)]
+            legacy_size = self._stored_size(legacy)
+            # Exactly what get_snapshot_or_build hands to set_tagged, wrapper and tag generations included
+            snapshot_size = self._stored_size(tagged_entry((SNAPSHOT_SCHEMA_VERSION, rows), get_generations(tags)))
+            saved = legacy_size - snapshot_size
+            total_saved += saved
+
+            line = (
+                f'{cache_key}: {len(rows)} rows, queryset {legacy_size} B, '
+                f'snapshot entry {snapshot_size} B, saved {saved} B ({saved * 100 // max(legacy_size, 1)}%)'
+            )
+            if redis_conn is not None:
+                usage = redis_conn.memory_usage(cache.make_key(cache_key))
+                line += f', redis MEMORY USAGE {usage} B'
+            self.stdout.write(line)
+
+        self.stdout.write(self.style.SUCCESS(f'Total saved: {total_saved} B'))
+
+    @staticmethod
+    def _stored_size(value):
+        """Bytes of a cached value, serialized the way django-redis' pickle serializer does"""
+        return len(pickle.dumps(value, pickle.DEFAULT_PROTOCOL))
+
+    def _get_redis_connection(self):
+        if not settings.USE_CACHE:
+            return None
+        try:
+            from django_redis import get_redis_connection
+            return get_redis_connection("default")
+        except Exception as e:
+            self.stdout.write(self.style.WARNING(f'Redis not reachable, skipping MEMORY USAGE: {e}'))
+            return None
@@ -0,0 +1,66 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.common.search_outbox import drain
+from apps.common.search_service import SearchService, search_service
+
+
+class Command(BaseCommand):
+    help = 'Send pending search outbox events to ElasticSearch as batched _bulk requests'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Outbox events per _bulk request (default: 500)',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and poll for new events',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Seconds to wait when the outbox is empty or ElasticSearch is down (with --loop, default: 1)',
+        )
+        parser.add_argument(
+            '--es-url',
+            help='ElasticSearch URL to use instead of the configured host',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.SEARCH_OUTBOX_ENABLED:
+            self.stdout.write(self.style.WARNING('Search outbox is disabled (SEARCH_OUTBOX_ENABLED). Nothing to drain.'))
+            return
+
+        service = SearchService(es_url=options['es_url']) if options['es_url'] else search_service
+        batch_size = options['batch_size']
+
+        if not options['loop'] and not service.ping():
+            self.stdout.write(self.style.WARNING('ElasticSearch is not available. Events left in the outbox.'))
+            return
+
+        total = 0
+        while True:
+            try:
+                drained = drain(service, batch_size) if service.es_available else 0
+            except Exception as e:
+                # Events stay in the outbox and are retried
+                self.stdout.write(self.style.WARNING(f'Failed to drain search outbox: {e}'))
+                drained = 0
+
+            total += drained
+            if drained:
+                self.stdout.write(f'Sent {drained} outbox events')
+
+            if drained < batch_size:
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Drained {total} search outbox events'))
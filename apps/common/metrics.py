@@ -0,0 +1,59 @@
+"""
+In-process counters and timings used to instrument the cache and search layers
+
+Values are kept per worker process and exposed through the metrics view.
+"""
+import threading
+from collections import defaultdict
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_timings = {}
+
+
+def increment(name, amount=1):
+    """Add amount to the counter called name"""
+    with _lock:
+        _counters[name] += amount
+
+
+def observe(name, seconds):
+    """Record one duration (in seconds) for the timing called name"""
+    with _lock:
+        count, total, longest = _timings.get(name, (0, 0.0, 0.0))
+        _timings[name] = (count + 1, total + seconds, max(longest, seconds))
+
+
+def ratio(hits, misses):
+    """Hit ratio of two counters, None when nothing was recorded yet"""
+    with _lock:
+        hit_count, miss_count = _counters.get(hits, 0), _counters.get(misses, 0)
+    total = hit_count + miss_count
+    return round(hit_count / total, 4) if total else None
+
+
+def snapshot():
+    """
+    Get a copy of every counter and timing
+
+    Returns:
+        dict: {"counters": {name: value}, "timings": {name: {"count", "avg_ms", "max_ms"}}}
+    """
+    with _lock:
+        counters = dict(_counters)
+        timings = {
+            name: {
+                "count": count,
+                "avg_ms": round(total * 1000 / count, 3),
+                "max_ms": round(longest * 1000, 3),
+            }
+            for name, (count, total, longest) in _timings.items()
+        }
+    return {"counters": counters, "timings": timings}
+
+
+def reset():
+    """Clear every counter and timing"""
+    with _lock:
+        _counters.clear()
+        _timings.clear()
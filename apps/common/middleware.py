@@ -0,0 +1,93 @@
+"""
+Per-request database query inspection
+
+When QUERY_INSPECTOR_ENABLED is set, every query run while handling a
+request is counted and timed through connection.execute_wrapper. Statements
+are grouped by fingerprint (the SQL with its parameters left out and IN
+lists collapsed), so the same statement repeated with different ids shows
+up as a duplicate, which is the signature of an N+1.
+
+Results are added to the response as X-DB-Query-Count, X-DB-Time-Ms and
+X-DB-Duplicate-Queries headers and logged, at WARNING level when the
+request repeats a statement or exceeds QUERY_INSPECTOR_WARN_QUERIES.
+"""
+import logging
+import re
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from apps.common import metrics
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r"IN \((?:%s, )*%s\)")
+
+
+def fingerprint(sql):
+    """Normalize a statement so repeats with different parameters compare equal"""
+    return _IN_LIST.sub("IN (...)", sql)
+
+
+class QueryRecorder:
+    """execute_wrapper collecting query count, time and fingerprints"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        """Fingerprints run more than once, with how many times each ran"""
+        return {sql: n for sql, n in self.fingerprints.items() if n > 1}
+
+
+class QueryInspectorMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, "QUERY_INSPECTOR_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.warn_queries = getattr(settings, "QUERY_INSPECTOR_WARN_QUERIES", 20)
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+
+        duplicates = recorder.duplicates
+        duplicate_count = sum(n - 1 for n in duplicates.values())
+        duration_ms = recorder.duration * 1000
+
+        response["X-DB-Query-Count"] = str(recorder.count)
+        response["X-DB-Time-Ms"] = f"{duration_ms:.1f}"
+        response["X-DB-Duplicate-Queries"] = str(duplicate_count)
+
+        metrics.increment("db.queries", recorder.count)
+        metrics.increment("db.duplicate_queries", duplicate_count)
+        metrics.observe("db.request", recorder.duration)
+
+        level = logging.DEBUG
+        if duplicates or recorder.count > self.warn_queries:
+            level = logging.WARNING
+        logger.log(
+            level,
+            f"{request.method} {request.path}: {recorder.count} queries in {duration_ms:.1f}ms, "
+            f"{duplicate_count} duplicated",
+        )
+        for sql, n in duplicates.items():
+            logger.log(level, f"  {n}x {sql}")
+
+        return response
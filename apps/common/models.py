@@ -1 +1,34 @@
-# This module may contain model definitions in the future
+from django.db import models
+
+
+class SearchOutbox(models.Model):
+    """
+    Pending change to the search index
+
+    Rows are written by the book and author signal handlers inside the
+    transaction that changed the data, so an event exists if and only if
+    the change committed. drain_search_outbox claims them in batches (a
+    short lease in claimed_until), sends them to ElasticSearch and deletes
+    them.
+    """
+
+    BOOK = "book"
+    AUTHOR = "author"
+    KIND_CHOICES = [(BOOK, "Book"), (AUTHOR, "Author")]
+
+    INDEX = "index"
+    DELETE = "delete"
+    ACTION_CHOICES = [(INDEX, "Index"), (DELETE, "Delete")]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES, default=INDEX)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Set while a worker is sending the event, other workers skip it until then
+    claimed_until = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self) -> str:
+        return f"{self.action} {self.kind}:{self.object_id}"
@@ -0,0 +1,235 @@
+"""
+Keyset (cursor) pagination
+
+Pages are addressed by the ordering values of the last (or first) row of
+the previous page instead of a page number, so fetching a page is a
+WHERE (name, id) > (...) ORDER BY name, id LIMIT n+1 range scan on a
+composite index whatever the depth, and no exact COUNT(*) is needed.
+
+Cursors are opaque, URL-safe tokens. An invalid or tampered cursor falls
+back to the first page, the same way Paginator.get_page treats a bad page
+number.
+"""
+import base64
+import binascii
+import hashlib
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.fields.tuple_lookups import Tuple, TupleGreaterThan, TupleLessThan
+from django.utils.functional import cached_property
+
+from apps.common.cache_utils import CACHE_TTL, cache, get_generation, get_snapshot_or_build
+
+NEXT = "n"
+PREVIOUS = "p"
+
+
+def estimated_count(queryset):
+    """
+    Cheap row count for a listing
+
+    On PostgreSQL an unfiltered listing uses the planner's estimate from
+    pg_class.reltuples instead of a full COUNT(*) scan. Filtered querysets
+    (and tables that have never been analyzed) still get an exact count,
+    which stays cheap as long as the filter is indexed.
+    """
+    if connection.vendor == "postgresql" and not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row and row[0] >= 0:
+            return row[0]
+
+    return queryset.count()
+
+
+class CursorPage:
+    """One page of a CursorPaginator, exposing the cursors of its neighbours"""
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Paginate a queryset by its ordering values
+
+    The ordering must be unique (end it with "id") and may mix ascending and
+    descending fields, e.g. ("name", "id") or ("-year", "id"). row_key maps a
+    row to its ordering values; by default they are read as attributes,
+    which suits model instances.
+
+    With a cache_namespace, each page is stored as a row snapshot under the
+    namespace generation and cursor, and invalidate_tags(cache_namespace)
+    drops every cached page at once, as well as the cached count. Snapshots
+    hold plain tuples, so cached listings must be values_list querysets.
+
+    Usage:
+        paginator = CursorPaginator(BookListRow.values(), BookListRow.ORDERING, 10,
+                                    row_key=BookListRow.cursor_key, cache_namespace="books_index")
+        books = paginator.get_page(request.GET.get("cursor"))
+    """
+
+    def __init__(self, queryset, ordering, per_page, row_key=None, cache_namespace=None, ttl=CACHE_TTL):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.fields = tuple(field.lstrip("-") for field in self.ordering)
+        self.row_key = row_key or (lambda row: tuple(getattr(row, field) for field in self.fields))
+        self.cache_namespace = cache_namespace
+        self.ttl = ttl
+
+    @cached_property
+    def generation(self):
+        return get_generation(self.cache_namespace)
+
+    def _cache_key(self, suffix):
+        return f"{self.cache_namespace}:{self.generation}:{suffix}"
+
+    def page_key(self, cursor=None):
+        """Cache key of the page a cursor points to (None is the first page)"""
+        digest = hashlib.sha1(cursor.encode()).hexdigest() if cursor else "first"
+        return self._cache_key(f"cursor:{self.per_page}:{digest}")
+
+    @cached_property
+    def count(self):
+        """Estimated number of rows in the listing"""
+        if self.cache_namespace is None:
+            return estimated_count(self.queryset)
+
+        count_key = self._cache_key("count")
+        total = cache.get(count_key)
+        if total is None:
+            total = estimated_count(self.queryset)
+            cache.set(count_key, total, self.ttl)
+        return total
+
+    def encode_cursor(self, values, direction):
+        payload = json.dumps([direction, list(values)], separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        """Return (direction, values), or None when the cursor is not valid"""
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (binascii.Error, TypeError, ValueError, UnicodeDecodeError):
+            return None
+
+        if direction not in (NEXT, PREVIOUS) or not isinstance(values, list) or len(values) != len(self.fields):
+            return None
+
+        try:
+            values = [self._to_python(field, value) for field, value in zip(self.fields, values)]
+        except ValidationError:
+            return None
+        return direction, values
+
+    def _to_python(self, name, value):
+        """A cursor value converted to the type of its ordering field, anything but a scalar is rejected"""
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            raise ValidationError(f"Invalid cursor value for {name}")
+
+        try:
+            field = self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Ordering by an annotation, which has no field to convert with
+            return value
+        return field.to_python(value)
+
+    def _seek(self, values, forward):
+        """
+        Filter for the rows strictly after (or before) values in the ordering
+
+        When every field sorts the same way this is the row comparison
+        (a, b) > (x, y), which PostgreSQL turns into a range scan of the
+        composite index. Mixed directions expand it into
+        a > x OR (a = x AND b > y). Either way a redundant a >= x is ANDed
+        in front, so the scan starts at the cursor instead of the start of
+        the index even where the comparison is expanded.
+        """
+        def lookup(field):
+            return "lt" if field.startswith("-") == forward else "gt"
+
+        if len({field.startswith("-") for field in self.ordering}) == 1:
+            row_lookup = TupleLessThan if lookup(self.ordering[0]) == "lt" else TupleGreaterThan
+            condition = Q(row_lookup(Tuple(*(F(name) for name in self.fields)), list(values)))
+        else:
+            condition = Q()
+            equal = {}
+            for field, value in zip(self.ordering, values):
+                name = field.lstrip("-")
+                condition |= Q(**equal, **{f"{name}__{lookup(field)}": value})
+                equal[name] = value
+
+        leading_bound = Q(**{f"{self.fields[0]}__{lookup(self.ordering[0])}e": values[0]})
+        return leading_bound & condition
+
+    def _reversed_ordering(self):
+        return tuple(field[1:] if field.startswith("-") else f"-{field}" for field in self.ordering)
+
+    def _fetch(self, decoded):
+        """Rows of the requested page, plus one extra row to detect a further page"""
+        if decoded is None:
+            queryset = self.queryset.order_by(*self.ordering)
+        else:
+            direction, values = decoded
+            forward = direction == NEXT
+            ordering = self.ordering if forward else self._reversed_ordering()
+            queryset = self.queryset.filter(self._seek(values, forward)).order_by(*ordering)
+        return list(queryset[:self.per_page + 1])
+
+    def get_page(self, cursor=None):
+        decoded = self.decode_cursor(cursor) if cursor else None
+        if decoded is None:
+            cursor = None
+
+        if self.cache_namespace is None:
+            rows = self._fetch(decoded)
+        else:
+            rows = get_snapshot_or_build(self.page_key(cursor), lambda: self._fetch(decoded), self.ttl)
+
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        going_back = decoded is not None and decoded[0] == PREVIOUS
+        if going_back:
+            rows.reverse()
+
+        has_next = has_more if not going_back else True
+        has_previous = decoded is not None and (has_more or not going_back)
+
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = self.encode_cursor(self.row_key(rows[-1]), NEXT)
+        if rows and has_previous:
+            previous_cursor = self.encode_cursor(self.row_key(rows[0]), PREVIOUS)
+
+        return CursorPage(rows, self, next_cursor, previous_cursor)
@@ -0,0 +1,162 @@
+"""
+Transactional outbox for search index updates
+
+Signal handlers call enqueue_book / enqueue_author instead of talking to
+ElasticSearch, so saving a book never waits on ES. drain() is run by the
+drain_search_outbox worker: it claims a batch of events, coalesces them
+(several changes to one book become a single action, an author rename
+becomes an update of each of the author's books) and sends one _bulk
+request.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.common import metrics
+from apps.common.cache_utils import invalidate_tags
+from apps.common.models import SearchOutbox
+from apps.common.search_service import BOOKS_INDEX, SEARCH_INDEX_TAG, book_document
+
+logger = logging.getLogger(__name__)
+
+# Seconds a claimed batch is reserved for its worker, longer than ELASTICSEARCH_BULK_TIMEOUT
+CLAIM_TTL = 120
+
+
+def _enqueue(kind, object_id, action):
+    if getattr(settings, "SEARCH_OUTBOX_ENABLED", False):
+        SearchOutbox.objects.create(kind=kind, object_id=object_id, action=action)
+
+
+def enqueue_book(book_id, action=SearchOutbox.INDEX):
+    """Record that a book must be (re)indexed or deleted"""
+    _enqueue(SearchOutbox.BOOK, book_id, action)
+
+
+def enqueue_author(author_id):
+    """Record that every book of an author must be reindexed (e.g. after a rename)"""
+    _enqueue(SearchOutbox.AUTHOR, author_id, SearchOutbox.INDEX)
+
+
+def coalesce(events):
+    """
+    Reduce outbox events to the set of books to index and to delete
+
+    Events are applied in order, so the last change to a book wins.
+
+    Returns:
+        tuple: (ids to index, ids to delete)
+    """
+    from apps.books.models import Book
+
+    book_actions = {}
+    author_ids = set()
+    for event in events:
+        if event.kind == SearchOutbox.AUTHOR:
+            author_ids.add(event.object_id)
+        else:
+            book_actions[event.object_id] = event.action
+
+    index_ids = {book_id for book_id, action in book_actions.items() if action == SearchOutbox.INDEX}
+    delete_ids = set(book_actions) - index_ids
+    if author_ids:
+        index_ids |= set(Book.objects.filter(author_id__in=author_ids).values_list("id", flat=True))
+
+    return index_ids, delete_ids - index_ids
+
+
+def build_actions(index_ids, delete_ids):
+    """_bulk actions for the coalesced changes, books gone since are deleted instead"""
+    from apps.books.models import Book
+
+    books = Book.objects.select_related("author").defer("search_vector").in_bulk(index_ids)
+    actions = [
+        {"_index": BOOKS_INDEX, "_id": book.id, "_source": book_document(book)}
+        for book in books.values()
+    ]
+    actions += [
+        {"_op_type": "delete", "_index": BOOKS_INDEX, "_id": book_id}
+        for book_id in delete_ids | (index_ids - set(books))
+    ]
+    return actions
+
+
+def claim(batch_size):
+    """
+    Lease a batch of outbox events to this worker in one short transaction
+
+    Rows are picked with SELECT ... FOR UPDATE SKIP LOCKED and stamped with
+    claimed_until, so the row locks are released before ElasticSearch is
+    called and other workers skip the batch until the lease expires.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            SearchOutbox.objects
+            .select_for_update(skip_locked=True)
+            .filter(Q(claimed_until__isnull=True) | Q(claimed_until__lt=now))
+            .order_by("id")[:batch_size]
+        )
+        SearchOutbox.objects.filter(id__in=[event.id for event in events]).update(
+            claimed_until=now + timedelta(seconds=CLAIM_TTL)
+        )
+    return events
+
+
+def drain(service, batch_size=500):
+    """
+    Send one batch of outbox events to ElasticSearch
+
+    The batch is claimed first (see claim), several workers can drain
+    concurrently. The _bulk request runs outside any transaction and goes
+    through the service's circuit breaker, so an outage opens the breaker
+    instead of every run waiting on timeouts. If ES cannot be reached the
+    claim is released and the events are retried on the next call.
+    Otherwise the batch is deleted; documents ES rejected with a transient
+    error (429 or 5xx) are queued again, other rejections are logged and
+    dropped, a later change or a full reindex repairs them.
+    Cached search results are invalidated once the batch is sent.
+
+    Returns:
+        int: Number of events processed
+    """
+    from elasticsearch.helpers import bulk
+
+    events = claim(batch_size)
+    if not events:
+        return 0
+    event_ids = [event.id for event in events]
+
+    try:
+        actions = build_actions(*coalesce(events))
+        _, errors = service._call(
+            lambda es: bulk(service.admin_client, actions, raise_on_error=False, ignore_status=(404,))
+        )
+    except Exception:
+        SearchOutbox.objects.filter(id__in=event_ids).update(claimed_until=None)
+        raise
+
+    retry_ids = set()
+    for error in errors:
+        (op_type, item), = error.items()
+        if item.get("status") == 429 or item.get("status", 0) >= 500:
+            retry_ids.add((int(item["_id"]), SearchOutbox.DELETE if op_type == "delete" else SearchOutbox.INDEX))
+        else:
+            logger.error(f"Search outbox document rejected: {error}")
+
+    with transaction.atomic():
+        SearchOutbox.objects.filter(id__in=event_ids).delete()
+        SearchOutbox.objects.bulk_create(
+            SearchOutbox(kind=SearchOutbox.BOOK, object_id=book_id, action=action) for book_id, action in retry_ids
+        )
+
+    # Results cached while ElasticSearch still had the previous documents
+    invalidate_tags(SEARCH_INDEX_TAG)
+    metrics.increment("search.outbox.events", len(events))
+    metrics.increment("search.outbox.documents", len(actions))
+    metrics.increment("search.outbox.errors", len(errors))
+    return len(events)
@@ -1,57 +1,321 @@
+import hashlib
 import logging
+import threading
+import time
+
 from django.conf import settings
-from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.core.paginator import Paginator
+from django.utils import timezone
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db.models import F, Q
+from django.db.models.functions import Greatest, Upper
+
+from apps.common import metrics
+from apps.common.cache_utils import get_generations, get_tagged, set_tagged
 
 logger = logging.getLogger(__name__)
 
 try:
-    from elasticsearch import Elasticsearch
+    from elasticsearch import ApiError, ConnectionError as ESConnectionError, ConnectionTimeout, Elasticsearch
     ELASTICSEARCH_AVAILABLE = True
 except ImportError:
     ELASTICSEARCH_AVAILABLE = False
     logger.warning("ElasticSearch not available. Falling back to database search.")
 
 
+# Cache tag of search results, bumped when books change (signals) and when the
+# search outbox reaches ElasticSearch
+SEARCH_INDEX_TAG = "search-index"
+
+# Suggestions returned by SearchService.suggest
+AUTOCOMPLETE_SIZE = 8
+
+# ElasticSearch refuses from + size beyond index.max_result_window (10000 by default)
+MAX_RESULT_WINDOW = 10000
+
+
+def normalize_query(query):
+    """Lowercase and collapse whitespace, every backend matches case-insensitively"""
+    return " ".join(query.split()).lower()
+
+
+class CachedResults:
+    """
+    Stand-in for the results of a cached search page, for use with Paginator
+
+    count() is the cached total and slicing returns the cached rows, so it
+    only serves the page it was built for.
+    """
+
+    def __init__(self, total, rows):
+        self.total = total
+        self.rows = rows
+
+    def count(self):
+        return self.total
+
+    def __getitem__(self, index):
+        return self.rows
+
+
+class ElasticsearchHits:
+    """
+    Lazy sequence over the hits of one ES query, for use with Paginator
+
+    count() is the ES total hit count and slicing fetches only that slice
+    with from/size, in relevance order. Rows are BookSearchRow tuples built
+    from the hit _source and summary highlight. prefetch_page() runs the request of the page about
+    to be shown, so a page costs a single ES request.
+    """
+
+    def __init__(self, service, query):
+        self.service = service
+        self.query = query
+        self.total = None
+        self._slices = {}
+
+    def _fetch(self, start, stop):
+        # A slice already fetched may cover this one (e.g. the prefetched last page)
+        for (fetched_start, fetched_stop), rows in self._slices.items():
+            if fetched_start <= start and stop <= fetched_stop:
+                return rows[start - fetched_start:stop - fetched_start]
+
+        response = self.service._elasticsearch_search(self.query, start, stop - start)
+        self.total = response['hits']['total']['value']
+        rows = [self._row(hit) for hit in response['hits']['hits']]
+        self._slices[(start, stop)] = rows
+        return rows
+
+    @staticmethod
+    def _row(hit):
+        source = hit['_source']
+        published_at = source.get('published_at')
+        year = int(published_at[:4]) if published_at else None
+        headline = ' … '.join(hit.get('highlight', {}).get('summary', []))
+        return (source['id'], source['name'], source.get('author_name'), year, source.get('cover_image') or '', headline)
+
+    def prefetch_page(self, page_number, per_page):
+        try:
+            number = max(int(page_number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        start = min((number - 1) * per_page, MAX_RESULT_WINDOW - per_page)
+        self._fetch(start, start + per_page)
+
+    def count(self):
+        if self.total is None:
+            self._fetch(0, 0)
+        return min(self.total, MAX_RESULT_WINDOW)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError("ElasticsearchHits only supports slicing")
+        return self._fetch(index.start or 0, index.stop)
+
+
+# Name searched and written by the application. It is an alias of a
+# versioned index (books-<timestamp>) so a full reindex can be swapped in.
+BOOKS_INDEX = 'books'
+
+BOOKS_MAPPING = {
+    "properties": {
+        "id": {"type": "integer"},
+        "name": {
+            "type": "text",
+            "analyzer": "standard",
+            # Edge n-gram subfields (name.suggest._2gram, ._3gram, ._index_prefix) for autocomplete
+            "fields": {
+                "suggest": {"type": "search_as_you_type"}
+            }
+        },
+        "summary": {
+            "type": "text",
+            "analyzer": "standard"
+        },
+        "author_name": {
+            "type": "text",
+            "analyzer": "standard"
+        },
+        "published_at": {"type": "date"},
+        "total_sales": {"type": "integer"},
+        "cover_image": {"type": "keyword", "index": False}
+    }
+}
+
+
+def book_document(book):
+    """ES document of a book, load books with select_related('author')"""
+    return {
+        'id': book.id,
+        'name': book.name,
+        'summary': book.summary,
+        'author_name': book.author.name,
+        'published_at': book.published_at.isoformat() if book.published_at else None,
+        'total_sales': book.total_sales,
+        'cover_image': book.cover_image.name if book.cover_image else None,
+    }
+
+
+class SearchUnavailable(Exception):
+    """Raised instead of calling ElasticSearch while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Stop calling a failing dependency for a while, then probe it again
+
+    closed: calls go through, consecutive failures are counted.
+    open: after failure_threshold consecutive failures calls are refused
+    for reset_timeout seconds.
+    half-open: once reset_timeout has passed, a single probe call is let
+    through; its success closes the breaker, its failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold=3, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def _probe_due(self):
+        return self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout
+
+    def would_allow(self):
+        """Whether a call would currently be let through, without claiming the probe"""
+        return self.state == self.CLOSED or self._probe_due()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self._probe_due():
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("ElasticSearch circuit breaker closed")
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    metrics.increment("search.breaker.opened")
+                    logger.warning(f"ElasticSearch circuit breaker open for {self.reset_timeout}s")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+def _is_outage(exc):
+    """Connection problems, timeouts and 5xx responses count against the breaker, 4xx do not"""
+    if isinstance(exc, (ESConnectionError, ConnectionTimeout)):
+        return True
+    return isinstance(exc, ApiError) and exc.meta.status >= 500
+
+
 class SearchService:
-    def __init__(self):
-        self.es_client = None
-        self.es_available = False
-        
-        if ELASTICSEARCH_AVAILABLE:
-            try:
-                es_host = getattr(settings, 'ELASTICSEARCH_HOST', 'localhost')
-                es_port = getattr(settings, 'ELASTICSEARCH_PORT', 9200)
-                
-                self.es_client = Elasticsearch([f'http://{es_host}:{es_port}'])
-                
-                # Test connection
-                if self.es_client.ping():
-                    self.es_available = True
-                    logger.info("ElasticSearch connection established")
-                else:
-                    logger.warning("ElasticSearch ping failed. Using database search.")
-            except Exception as e:
-                logger.warning(f"ElasticSearch connection failed: {e}. Using database search.")
-    
+    """
+    ElasticSearch access with a database fallback
+
+    Nothing is contacted at import time: the client is created on first use
+    with short timeouts (ELASTICSEARCH_TIMEOUT) and no retries, and every
+    call goes through a circuit breaker, so a slow or missing ElasticSearch
+    costs at most a few timeouts before searches go straight to the database.
+    ES call latency is recorded as the search.es timing and fallbacks as
+    search.fallback.* counters in apps.common.metrics.
+    """
+
+    def __init__(self, es_url=None):
+        self.es_url = es_url
+        self._es_client = None
+        self._client_lock = threading.Lock()
+        self.breaker = CircuitBreaker(
+            failure_threshold=getattr(settings, 'ELASTICSEARCH_FAILURE_THRESHOLD', 3),
+            reset_timeout=getattr(settings, 'ELASTICSEARCH_RESET_TIMEOUT', 30),
+        )
+
+    @property
+    def es_client(self):
+        if self._es_client is None and ELASTICSEARCH_AVAILABLE:
+            with self._client_lock:
+                if self._es_client is None:
+                    es_url = self.es_url
+                    if es_url is None:
+                        es_host = getattr(settings, 'ELASTICSEARCH_HOST', 'localhost')
+                        es_port = getattr(settings, 'ELASTICSEARCH_PORT', 9200)
+                        es_url = f'http://{es_host}:{es_port}'
+
+                    self._es_client = Elasticsearch(
+                        [es_url],
+                        request_timeout=getattr(settings, 'ELASTICSEARCH_TIMEOUT', 1.0),
+                        max_retries=0,
+                        retry_on_timeout=False,
+                    )
+        return self._es_client
+
+    @property
+    def admin_client(self):
+        """Client with a longer timeout for index management and bulk loads"""
+        return self.es_client.options(request_timeout=getattr(settings, 'ELASTICSEARCH_BULK_TIMEOUT', 30))
+
+    @property
+    def es_available(self):
+        """Whether ElasticSearch may be tried now (the breaker is not open)"""
+        return ELASTICSEARCH_AVAILABLE and self.breaker.would_allow()
+
+    def _call(self, operation):
+        """Run operation(es_client) through the circuit breaker, timing it"""
+        if not ELASTICSEARCH_AVAILABLE or not self.breaker.allow():
+            raise SearchUnavailable("ElasticSearch circuit breaker is open")
+
+        started = time.perf_counter()
+        try:
+            result = operation(self.es_client)
+        except Exception as e:
+            if _is_outage(e):
+                metrics.increment("search.es.error")
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+        finally:
+            metrics.observe("search.es", time.perf_counter() - started)
+
+        self.breaker.record_success()
+        return result
+
+    def ping(self):
+        """Check that ElasticSearch answers, used by management commands before bulk work"""
+        try:
+            return self._call(lambda es: es.options(request_timeout=5).info()) is not None
+        except Exception as e:
+            logger.warning(f"ElasticSearch not reachable: {e}")
+            return False
+
     def index_book(self, book):
         if not self.es_available:
             return
         
         try:
-            doc = {
-                'id': book.id,
-                'name': book.name,
-                'summary': book.summary,
-                'author_name': book.author.name,
-                'published_at': book.published_at.isoformat() if book.published_at else None,
-                'total_sales': book.total_sales,
-            }
-            
-            self.es_client.index(
-                index='books',
+            self._call(lambda es: es.index(
+                index=BOOKS_INDEX,
                 id=book.id,
-                body=doc
-            )
+                body=book_document(book)
+            ))
             logger.debug(f"Book {book.id} indexed in ElasticSearch")
         except Exception as e:
             logger.error(f"Failed to index book {book.id}: {e}")
@@ -61,98 +325,331 @@ class SearchService:
             return
         
         try:
-            self.es_client.delete(
-                index='books',
+            self._call(lambda es: es.options(ignore_status=404).delete(
+                index=BOOKS_INDEX,
                 id=book_id,
-                ignore=[404] 
-            )
+            ))
             logger.debug(f"Book {book_id} deleted from ElasticSearch")
         except Exception as e:
             logger.error(f"Failed to delete book {book_id}: {e}")
     
-    def search_books(self, query, queryset=None):
-        if not query or not query.strip():
-            return queryset if queryset is not None else []
-        
-        if self.es_available:
-            return self._elasticsearch_search(query, queryset)
+    def search_page(self, query, page_number=None, per_page=10):
+        """
+        Search books and return the requested page of results
+
+        With ElasticSearch only the requested page is fetched (from/size),
+        in relevance order, and its rows are built from the hit _source, so
+        no database query is needed. The total comes from the ES hit count.
+        Without ElasticSearch, the database search is paginated instead,
+        using SEARCH_FALLBACK_BACKEND. SEARCH_BACKEND selects a database
+        backend ("fulltext" or "trigram") to skip ElasticSearch altogether.
+
+        Result pages are cached for SEARCH_CACHE_TTL seconds, keyed by the
+        normalized query, page, page size and the backend serving it, and
+        dropped when the search-index generation moves (see
+        SEARCH_INDEX_TAG). Hits and misses are counted as search.cache.*.
+
+        Args:
+            query (str): Text typed by the user
+            page_number: Requested page (invalid values give the first page)
+            per_page (int): Results per page
+
+        Returns:
+            Page: Page whose object_list holds BookSearchRow tuples
+        """
+        query = normalize_query(query)
+        ttl = settings.SEARCH_CACHE_TTL
+        if not ttl:
+            return self._search_page(query, page_number, per_page)[0]
+
+        backend = self._expected_backend()
+        cache_key = self._results_cache_key(query, page_number, per_page, backend)
+        cached = get_tagged(cache_key)
+        if cached is not None:
+            metrics.increment("search.cache.hit")
+            number, total, rows = cached
+            return Paginator(CachedResults(total, rows), per_page).page(number)
+
+        metrics.increment("search.cache.miss")
+        tag_generations = get_generations([SEARCH_INDEX_TAG])
+        page, served_by = self._search_page(query, page_number, per_page)
+        page.object_list = [tuple(row) for row in page.object_list]
+
+        # A page served by the fallback after an ES error is not stored under the ES key
+        if served_by == backend:
+            set_tagged(cache_key, (page.number, page.paginator.count, page.object_list), tag_generations, ttl)
+        return page
+
+    def _search_page(self, query, page_number, per_page):
+        """Uncached search_page, also returns the name of the backend that served it"""
+        from apps.books.models import BookSearchRow
+
+        backend = self.backend
+        if backend != "elasticsearch":
+            rows = BookSearchRow.values(self.database_search(query, backend))
+            return Paginator(rows, per_page).get_page(page_number), backend
+
+        if not ELASTICSEARCH_AVAILABLE:
+            metrics.increment("search.fallback.not_installed")
+        elif not self.es_available:
+            metrics.increment("search.fallback.circuit_open")
         else:
-            return self._database_search(query, queryset)
-    
-    def _elasticsearch_search(self, query, queryset):
+            hits = ElasticsearchHits(self, query)
+            try:
+                hits.prefetch_page(page_number, per_page)
+                return Paginator(hits, per_page).get_page(page_number), backend
+            except Exception as e:
+                metrics.increment("search.fallback.error")
+                logger.error(f"ElasticSearch search failed: {e}. Falling back to database search.")
+
+        fallback = settings.SEARCH_FALLBACK_BACKEND
+        rows = BookSearchRow.values(self.database_search(query, fallback))
+        return Paginator(rows, per_page).get_page(page_number), fallback
+
+    def _expected_backend(self):
+        """Backend the next search will most likely be served by"""
+        if self.backend != "elasticsearch" or self.es_available:
+            return self.backend
+        return settings.SEARCH_FALLBACK_BACKEND
+
+    @staticmethod
+    def _results_cache_key(query, page_number, per_page, backend):
         try:
-            search_body = {
-                "query": {
-                    "multi_match": {
-                        "query": query,
-                        "fields": ["name^2", "summary", "author_name"],
-                        "type": "best_fields",
-                        "fuzziness": "AUTO"
-                    }
-                },
-                "size": 1000,  
-                "_source": ["id"]
+            page_number = int(page_number)
+        except (TypeError, ValueError):
+            page_number = 1
+        query_hash = hashlib.sha1(query.encode()).hexdigest()
+        return f"search:{backend}:{per_page}:{page_number}:{query_hash}"
+
+    @property
+    def backend(self):
+        """Configured search backend: elasticsearch, fulltext or trigram"""
+        return settings.SEARCH_BACKEND
+
+    def _elasticsearch_search(self, query, start, size):
+        """Run one ES search for the hits in [start, start + size)"""
+        from apps.books.models import HEADLINE_START, HEADLINE_STOP
+
+        search_body = {
+            "query": {
+                "multi_match": {
+                    "query": query,
+                    "fields": ["name^2", "summary", "author_name"],
+                    "type": "best_fields",
+                    "fuzziness": "AUTO"
+                }
+            },
+            "from": start,
+            "size": size,
+            "track_total_hits": True,
+            "_source": ["id", "name", "author_name", "published_at", "cover_image"],
+            "highlight": {
+                "fields": {"summary": {"number_of_fragments": 1, "fragment_size": 200}},
+                "pre_tags": [HEADLINE_START],
+                "post_tags": [HEADLINE_STOP],
             }
-            
-            response = self.es_client.search(
-                index='books',
-                body=search_body
-            )
-            
-            book_ids = [hit['_source']['id'] for hit in response['hits']['hits']]
-            
-            if queryset is not None:
-                return queryset.filter(id__in=book_ids)
-            else:
-                return book_ids
-                
-        except Exception as e:
-            logger.error(f"ElasticSearch search failed: {e}. Falling back to database search.")
-            return self._database_search(query, queryset)
-    
-    def _database_search(self, query, queryset):
-        """Fallback database search using PostgreSQL full-text search"""
+        }
+
+        return self._call(lambda es: es.search(
+            index=BOOKS_INDEX,
+            body=search_body
+        ))
+
+    def database_search(self, query, backend="fulltext", queryset=None):
+        """
+        Search books in the database with the given backend
+
+        Args:
+            query (str): Text typed by the user
+            backend (str): "fulltext" or "trigram"
+            queryset: Books to search (all books by default)
+
+        Returns:
+            QuerySet: Matching books, best match first, annotated with a headline
+        """
         from apps.books.models import Book
-        
+
         if queryset is None:
             queryset = Book.objects.all()
-        
-        vector = SearchVector("summary", "name", "author__name")
+
+        metrics.increment(f"search.backend.{backend}")
+        if backend == "trigram":
+            return self._trigram_search(query, queryset)
+        return self._fulltext_search(query, queryset)
+
+    def _fulltext_search(self, query, queryset):
+        """
+        Database search using PostgreSQL full-text search
+
+        Matches against the stored, GIN-indexed Book.search_vector, ranks by
+        SearchRank (name matches weigh more than author, then summary) and
+        annotates a headline of the summary for the result page.
+        """
         search_query = SearchQuery(query)
-        return queryset.annotate(search=vector).filter(search=search_query)
-    
+        return (
+            queryset
+            .filter(search_vector=search_query)
+            .annotate(
+                rank=SearchRank(F("search_vector"), search_query),
+                headline=self._headline(search_query),
+            )
+            .order_by("-rank", "id")
+        )
+
+    def _trigram_search(self, query, queryset):
+        """
+        Fuzzy database search using pg_trgm, closer to ES fuzziness
+
+        Book and author names match when a word of theirs is similar to the
+        query (the %> operator, so typos and prefixes match too); exact
+        lexeme matches in the summary still come from the full-text vector.
+        Each condition is served by its own GIN index: the matching authors
+        are looked up first so the book query is a BitmapOr of index scans
+        instead of a LIKE '%x%' scan over a join. Results are ordered by the
+        best word similarity of the book or author name.
+        """
+        from apps.authors.models import Author
+
+        # The %> threshold (pg_trgm.word_similarity_threshold) is set per connection, see SEARCH_TRIGRAM_THRESHOLD
+        search_query = SearchQuery(query)
+        author_ids = list(Author.objects.filter(name__trigram_word_similar=query).values_list("id", flat=True))
+        return (
+            queryset
+            .filter(
+                Q(name__trigram_word_similar=query)
+                | Q(author_id__in=author_ids)
+                | Q(search_vector=search_query)
+            )
+            .annotate(
+                similarity=Greatest(
+                    TrigramWordSimilarity(query, "name"),
+                    TrigramWordSimilarity(query, "author__name"),
+                ),
+                rank=SearchRank(F("search_vector"), search_query),
+                headline=self._headline(search_query),
+            )
+            .order_by("-similarity", "-rank", "id")
+        )
+
+    @staticmethod
+    def _headline(search_query):
+        from apps.books.models import HEADLINE_START, HEADLINE_STOP
+
+        return SearchHeadline(
+            "summary",
+            search_query,
+            start_sel=HEADLINE_START,
+            stop_sel=HEADLINE_STOP,
+            max_words=30,
+            min_words=15,
+        )
+
+    def suggest(self, prefix, size=AUTOCOMPLETE_SIZE):
+        """
+        Books whose name starts with what the user typed so far
+
+        ElasticSearch matches word prefixes anywhere in the name through the
+        search_as_you_type subfield; the database matches the start of the
+        name through the Upper(name) prefix index. The same backend
+        selection and fallback as search_page apply.
+
+        Args:
+            prefix (str): Normalized text typed by the user
+            size (int): Maximum number of suggestions
+
+        Returns:
+            list: (id, name, author_name) tuples
+        """
+        if self.backend == "elasticsearch" and ELASTICSEARCH_AVAILABLE and self.es_available:
+            try:
+                return self._elasticsearch_suggest(prefix, size)
+            except Exception as e:
+                metrics.increment("search.autocomplete.fallback")
+                logger.error(f"ElasticSearch autocomplete failed: {e}. Falling back to database prefix search.")
+
+        return self._database_suggest(prefix, size)
+
+    def _elasticsearch_suggest(self, prefix, size):
+        response = self._call(lambda es: es.search(
+            index=BOOKS_INDEX,
+            query={
+                "multi_match": {
+                    "query": prefix,
+                    "type": "bool_prefix",
+                    "fields": ["name.suggest", "name.suggest._2gram", "name.suggest._3gram"],
+                }
+            },
+            size=size,
+            source=["id", "name", "author_name"],
+        ))
+        return [
+            (hit["_source"]["id"], hit["_source"]["name"], hit["_source"]["author_name"])
+            for hit in response["hits"]["hits"]
+        ]
+
+    def _database_suggest(self, prefix, size):
+        from apps.books.models import Book
+
+        # istartswith is UPPER(name) LIKE UPPER('prefix%'), served by the book_name_upper_prefix index
+        return list(
+            Book.objects
+            .filter(name__istartswith=prefix)
+            .order_by(Upper("name"), "id")
+            .values_list("id", "name", "author__name")[:size]
+        )
+
     def create_index_if_not_exists(self):
-        """Create the books index if it doesn't exist"""
+        """Create a versioned books index behind the books alias if neither exists"""
         if not self.es_available:
             return
         
         try:
-            if not self.es_client.indices.exists(index='books'):
-                mapping = {
-                    "mappings": {
-                        "properties": {
-                            "id": {"type": "integer"},
-                            "name": {
-                                "type": "text",
-                                "analyzer": "standard"
-                            },
-                            "summary": {
-                                "type": "text",
-                                "analyzer": "standard"
-                            },
-                            "author_name": {
-                                "type": "text",
-                                "analyzer": "standard"
-                            },
-                            "published_at": {"type": "date"},
-                            "total_sales": {"type": "integer"}
-                        }
-                    }
-                }
-                
-                self.es_client.indices.create(index='books', body=mapping)
-                logger.info("Books index created in ElasticSearch")
+            if not self.admin_client.indices.exists(index=BOOKS_INDEX):
+                index_name = self.create_versioned_index()
+                self.admin_client.indices.put_alias(index=index_name, name=BOOKS_INDEX)
+                logger.info(f"Books index {index_name} created in ElasticSearch")
         except Exception as e:
             logger.error(f"Failed to create ElasticSearch index: {e}")
 
+    def create_versioned_index(self, bulk_load=False):
+        """
+        Create a new, empty books-<timestamp> index and return its name
+
+        With bulk_load the index starts without refreshes or replicas, which
+        speeds up a full load; finish_bulk_load() restores both.
+        """
+        index_name = f"{BOOKS_INDEX}-{timezone.now():%Y%m%d%H%M%S%f}"
+        index_settings = {"refresh_interval": "-1", "number_of_replicas": 0} if bulk_load else {}
+        self.admin_client.indices.create(index=index_name, mappings=BOOKS_MAPPING, settings=index_settings)
+        return index_name
+
+    def finish_bulk_load(self, index_name):
+        # null resets both settings to the cluster defaults
+        self.admin_client.indices.put_settings(
+            index=index_name,
+            settings={"refresh_interval": None, "number_of_replicas": None},
+        )
+        self.admin_client.indices.refresh(index=index_name)
+
+    def swap_alias(self, index_name):
+        """
+        Point the books alias at index_name in one atomic _aliases request
+
+        A concrete index still named "books" (created before the alias was
+        introduced) is removed in the same request so the alias can take
+        its name. Returns the names of the indices that were replaced.
+        """
+        actions = []
+        replaced = []
+
+        if self.admin_client.indices.exists_alias(name=BOOKS_INDEX):
+            replaced = [name for name in self.admin_client.indices.get_alias(name=BOOKS_INDEX) if name != index_name]
+            actions += [{"remove": {"index": name, "alias": BOOKS_INDEX}} for name in replaced]
+        elif self.admin_client.indices.exists(index=BOOKS_INDEX):
+            actions.append({"remove_index": {"index": BOOKS_INDEX}})
+
+        actions.append({"add": {"index": index_name, "alias": BOOKS_INDEX}})
+        self.admin_client.indices.update_aliases(actions=actions)
+        return replaced
+
 search_service = SearchService()
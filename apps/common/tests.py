@@ -1,2 +1,569 @@
-# This file is required for Django app configuration
-# Tests will be added as needed
+import base64
+import json
+from datetime import date
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.management import call_command
+from django.db.models import Value
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from elasticsearch import ConnectionError as ESConnectionError
+
+from apps.authors.models import Author
+from apps.books.models import Book
+from apps.common import cache_utils
+from apps.common.cache_utils import cached_method, get_from_cache_or_db, invalidate_cache, invalidate_tags
+from apps.common.middleware import fingerprint
+from apps.common.models import SearchOutbox
+from apps.common.pagination import CursorPaginator
+from apps.common.search_outbox import build_actions, claim, coalesce, drain
+from apps.common.search_service import MAX_RESULT_WINDOW, CircuitBreaker, SearchService, search_service
+from apps.common.tiered_cache import LocalLRUCache, TwoTierCache
+from apps.reviews.models import Review
+from apps.sales.models import Sale
+from apps.stats.models import rebuild_stats
+
+DATA_FIXTURE = str(settings.BASE_DIR / "fixtures" / "data_fixture.json")
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class FingerprintTests(SimpleTestCase):
+    def test_in_lists_of_any_length_compare_equal(self):
+        self.assertEqual(
+            fingerprint('SELECT "id" FROM "t" WHERE "id" IN (%s)'),
+            fingerprint('SELECT "id" FROM "t" WHERE "id" IN (%s, %s, %s)'),
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class GetFromCacheOrDbTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_waiter_stops_waiting_when_the_lock_is_released_without_a_value(self):
+        cache.add("lock:book:1", 1)
+        # The holder found nothing to cache and released the lock during the first poll
+        with mock.patch("apps.common.cache_utils.time.sleep", side_effect=lambda _: cache.delete("lock:book:1")) as sleep:
+            self.assertIsNone(get_from_cache_or_db("book", 1, lambda: None))
+
+        self.assertEqual(sleep.call_count, 1)
+
+
+class Shelf:
+    """Stand-in instance for cached_method, counting the calls that reach it"""
+
+    def __init__(self, pk):
+        self.pk = pk
+        self.calls = 0
+
+    @cached_method(negative_ttl=7, tags=lambda shelf: ["shelves"])
+    def lookup(self, *args, **kwargs):
+        self.calls += 1
+        return None if kwargs.get("missing") else [args, kwargs]
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CachedMethodTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.shelf = Shelf(pk=1)
+
+    def test_none_results_are_cached_for_the_negative_ttl(self):
+        with mock.patch.object(cache_utils.cache, "set", wraps=cache_utils.cache.set) as cache_set:
+            self.assertIsNone(self.shelf.lookup(missing=True))
+            self.assertIsNone(self.shelf.lookup(missing=True))
+            self.shelf.lookup()
+
+        self.assertEqual(self.shelf.calls, 2)
+        self.assertEqual([call.args[2] for call in cache_set.call_args_list], [7, cache_utils.CACHE_TTL])
+
+    def test_equal_arguments_share_a_key(self):
+        self.shelf.lookup(Author(pk=3, name="First copy"), genre="poetry", year=1920)
+        self.shelf.lookup(Author(pk=3, name="Second copy"), year=1920, genre="poetry")
+
+        self.assertEqual(self.shelf.calls, 1)
+
+    def test_bumping_a_tag_drops_the_result(self):
+        self.shelf.lookup()
+        invalidate_tags("shelves")
+        self.shelf.lookup()
+        invalidate_cache("shelf", self.shelf.pk)
+        self.shelf.lookup()
+
+        self.assertEqual(self.shelf.calls, 3)
+
+
+class TwoTierCacheTests(SimpleTestCase):
+    @mock.patch.object(TwoTierCache, "_ensure_subscriber")
+    def test_omitted_timeout_uses_the_backend_default(self, _):
+        shared = mock.Mock()
+        tiered = TwoTierCache(shared, LocalLRUCache(max_entries=10, ttl=5))
+
+        tiered.set("key", "value")
+        tiered.set_many({"other": "value"})
+
+        shared.set.assert_called_once_with("key", "value", DEFAULT_TIMEOUT)
+        shared.set_many.assert_called_once_with({"other": "value"}, DEFAULT_TIMEOUT)
+        self.assertEqual(tiered.get("key"), "value")
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TamperedCursorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(name="Wislawa Szymborska", country="Poland")
+        Book.objects.create(author=author, name="View with a Grain of Sand", summary="Summary", published_at=date(1995, 1, 1))
+
+    @staticmethod
+    def cursor(values):
+        payload = json.dumps(["n", values]).encode()
+        return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+    def test_decodable_cursors_with_wrong_value_types_serve_the_first_page(self):
+        cursors = [
+            self.cursor([{"name": "x"}, 1]),
+            self.cursor(["Szymborska", ["id"]]),
+            self.cursor(["Szymborska", "not an id"]),
+            self.cursor([None, 1]),
+        ]
+        for url_name, context_name in (("books:index", "books"), ("authors:index", "authors")):
+            for cursor in cursors:
+                with self.subTest(url_name=url_name, cursor=cursor):
+                    response = self.client.get(reverse(url_name), {"cursor": cursor})
+                    self.assertEqual(response.status_code, 200)
+                    self.assertFalse(response.context[context_name].has_previous())
+
+
+class KeysetSeekTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(name="Pablo Neruda", country="Chile")
+        cls.books = [
+            Book.objects.create(author=author, name=f"Canto {i % 3}", summary="Summary", published_at=date(1950, 1, 1))
+            for i in range(7)
+        ]
+        for i, book in enumerate(cls.books):
+            Sale.objects.create(book=book, year=2000 + i % 2, sales=i)
+
+    def walk(self, paginator):
+        """Every page following the next cursors, with the SQL of the last one"""
+        rows, cursor = [], None
+        while True:
+            with CaptureQueriesContext(connection) as queries:
+                page = paginator.get_page(cursor)
+            rows += list(page)
+            if not page.has_next():
+                return rows, queries[-1]["sql"]
+            cursor = page.next_cursor
+
+    def test_deep_pages_carry_a_bound_on_the_leading_column(self):
+        cases = [
+            (CursorPaginator(Book.objects.all(), ("name", "id"), 2), '"books_book"."name" >= '),
+            (CursorPaginator(Sale.objects.all(), ("-year", "id"), 2), '"sales_sale"."year" <= '),
+        ]
+        for paginator, bound in cases:
+            with self.subTest(ordering=paginator.ordering):
+                rows, sql = self.walk(paginator)
+                self.assertIn(bound, sql)
+                self.assertEqual(rows, list(paginator.queryset.order_by(*paginator.ordering)))
+
+
+def es_response(total, start=0, size=0):
+    """A search response with `total` matching books, holding the hits in [start, start + size)"""
+    hits = [
+        {"_source": {"id": i, "name": f"Book {i}", "author_name": "Author", "published_at": "1970-01-01"}}
+        for i in range(start, min(start + size, total))
+    ]
+    return {"hits": {"total": {"value": total}, "hits": hits}}
+
+
+@override_settings(SEARCH_BACKEND="elasticsearch", SEARCH_CACHE_TTL=0)
+class ElasticsearchHitsTests(SimpleTestCase):
+    def setUp(self):
+        self.service = SearchService()
+        self.service._es_client = mock.Mock()
+        self.service._es_client.search.side_effect = lambda index, body: es_response(50000, body["from"], body["size"])
+
+    def requested_windows(self):
+        return [(call.kwargs["body"]["from"], call.kwargs["body"]["size"]) for call in self.service._es_client.search.call_args_list]
+
+    def test_a_page_is_one_request_for_its_slice(self):
+        page = self.service.search_page("book", 3, 10)
+
+        self.assertEqual(self.requested_windows(), [(20, 10)])
+        self.assertEqual([row[0] for row in page.object_list], list(range(20, 30)))
+
+    def test_pages_beyond_the_result_window_are_clamped(self):
+        page = self.service.search_page("book", 2000, 10)
+
+        self.assertEqual(self.requested_windows(), [(MAX_RESULT_WINDOW - 10, 10)])
+        self.assertEqual(page.paginator.count, MAX_RESULT_WINDOW)
+        self.assertEqual(page.number, MAX_RESULT_WINDOW // 10)
+        self.assertEqual(page.object_list[-1][0], MAX_RESULT_WINDOW - 1)
+
+
+@override_settings(
+    SEARCH_BACKEND="elasticsearch", SEARCH_CACHE_TTL=0,
+    ELASTICSEARCH_FAILURE_THRESHOLD=2, ELASTICSEARCH_RESET_TIMEOUT=30,
+)
+class CircuitBreakerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(name="Ursula K. Le Guin", country="USA")
+        Book.objects.create(author=author, name="The Dispossessed", summary="Summary", published_at=date(1974, 1, 1))
+
+    def setUp(self):
+        self.service = SearchService()
+        self.es = self.service._es_client = mock.Mock()
+        self.es.search.side_effect = ESConnectionError("ElasticSearch is down")
+        # Full-text search needs PostgreSQL, match names instead
+        patcher = mock.patch.object(self.service, "database_search", side_effect=lambda query, backend: (
+            Book.objects.filter(name__icontains=query).annotate(headline=Value(""))
+        ))
+        self.database_search = patcher.start()
+        self.addCleanup(patcher.stop)
+        # Every fallback logs an error, keep the test output readable
+        logger_patcher = mock.patch("apps.common.search_service.logger")
+        logger_patcher.start()
+        self.addCleanup(logger_patcher.stop)
+
+    def search(self):
+        return [row[1] for row in self.service.search_page("dispossessed", 1, 10).object_list]
+
+    def after_reset_timeout(self):
+        return mock.patch(
+            "apps.common.search_service.time.monotonic",
+            return_value=self.service.breaker.opened_at + self.service.breaker.reset_timeout,
+        )
+
+    def test_searches_skip_elasticsearch_while_the_breaker_is_open(self):
+        for _ in range(2):
+            self.assertEqual(self.search(), ["The Dispossessed"])
+        self.assertEqual(self.service.breaker.state, CircuitBreaker.OPEN)
+
+        self.assertEqual(self.search(), ["The Dispossessed"])
+
+        self.assertEqual(self.es.search.call_count, 2)
+        self.assertEqual(self.database_search.call_count, 3)
+
+    def test_successful_probe_after_the_reset_timeout_closes_the_breaker(self):
+        for _ in range(2):
+            self.search()
+        self.es.search.side_effect = lambda index, body: es_response(1, 0, 1)
+
+        with self.after_reset_timeout():
+            self.assertEqual(self.search(), ["Book 0"])
+
+        self.assertEqual(self.service.breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(self.database_search.call_count, 2)
+
+    def test_failed_probe_opens_the_breaker_again(self):
+        for _ in range(2):
+            self.search()
+
+        with self.after_reset_timeout():
+            self.assertEqual(self.search(), ["The Dispossessed"])
+            self.assertEqual(self.service.breaker.state, CircuitBreaker.OPEN)
+            self.search()
+
+        self.assertEqual(self.es.search.call_count, 3)
+        self.assertEqual(self.database_search.call_count, 4)
+
+
+@override_settings(QUERY_INSPECTOR_ENABLED=True)
+class QueryBudgetTests(TestCase):
+    """
+    Per-URL query budgets measured with the data fixture and a cold cache.
+    A view going over its budget, or repeating a statement, fails the build;
+    when a change legitimately needs more queries, raise the budget here.
+    """
+
+    fixtures = [DATA_FIXTURE]
+
+    # url name -> (anonymous budget, authenticated budget)
+    BUDGETS = {
+        "common:home": (0, 2),
+        "books:index": (3, 5),
+        "books:create": (3, 5),
+        "books:show": (3, 6),
+        "authors:index": (2, 4),
+        "authors:create": (2, 4),
+        "authors:show": (2, 4),
+        "sales:index": (3, 5),
+        "stats:index": (5, 7),
+        "stats:authors_data": (2, 4),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        # Fixtures load without signals, as in entrypoint.sh aggregate them afterwards
+        rebuild_stats()
+        cls.user = User.objects.get(username="maria.garcia")
+        book_id = Review.objects.values_list("book_id", flat=True).first()
+        author_id = Author.objects.values_list("id", flat=True).first()
+        cls.url_kwargs = {
+            "books:show": {"book_id": book_id},
+            "authors:show": {"author_id": author_id},
+            "sales:index": {"book_id": book_id},
+        }
+
+    def urls(self):
+        for name, budgets in self.BUDGETS.items():
+            yield name, reverse(name, kwargs=self.url_kwargs.get(name)), budgets
+
+    def assert_within_budget(self, url, response, budget):
+        self.assertEqual(response.status_code, 200, url)
+        self.assertLessEqual(int(response["X-DB-Query-Count"]), budget, url)
+        self.assertEqual(response["X-DB-Duplicate-Queries"], "0", url)
+
+    def test_anonymous_budgets(self):
+        for name, url, (budget, _) in self.urls():
+            with self.subTest(url=name):
+                self.assert_within_budget(url, self.client.get(url), budget)
+
+    def test_authenticated_budgets(self):
+        self.client.force_login(self.user)
+        for name, url, (_, budget) in self.urls():
+            with self.subTest(url=name):
+                self.assert_within_budget(url, self.client.get(url), budget)
+
+    def test_later_pages_cost_the_same(self):
+        for name, context_name in (("books:index", "books"), ("authors:index", "authors")):
+            with self.subTest(url=name):
+                cursor = None
+                for _ in range(3):
+                    params = {"cursor": cursor} if cursor else {}
+                    response = self.client.get(reverse(name), params)
+                    self.assert_within_budget(name, response, self.BUDGETS[name][0])
+                    cursor = response.context[context_name].next_cursor
+
+
+class QueryInspectorDisabledTests(TestCase):
+    @override_settings(QUERY_INSPECTOR_ENABLED=False)
+    def test_no_headers_when_disabled(self):
+        response = self.client.get(reverse("authors:index"))
+        self.assertNotIn("X-DB-Query-Count", response)
+
+
+@override_settings(SEARCH_OUTBOX_ENABLED=True)
+class SearchOutboxTests(TestCase):
+    def setUp(self):
+        self.service = SearchService()
+        self.service._es_client = mock.Mock()
+        self.author = Author.objects.create(name="Octavia Butler", country="USA")
+        self.books = [
+            Book.objects.create(author=self.author, name=f"Book {i}", summary="Summary", published_at=date(1980, 1, 1))
+            for i in range(3)
+        ]
+
+    def test_repeated_changes_to_a_book_are_coalesced(self):
+        first, second, third = self.books
+        deleted_id = second.id
+        first.name = "Kindred"
+        first.save()
+        second.delete()
+
+        index_ids, delete_ids = coalesce(SearchOutbox.objects.all())
+
+        self.assertEqual(index_ids, {first.id, third.id})
+        self.assertEqual(delete_ids, {deleted_id})
+        actions = build_actions(index_ids, delete_ids)
+        self.assertEqual(len(actions), 3)
+        self.assertIn({"_op_type": "delete", "_index": "books", "_id": deleted_id}, actions)
+
+    def test_author_rename_reindexes_all_of_the_author_books(self):
+        SearchOutbox.objects.all().delete()
+        self.author.country = "United States"
+        self.author.save()
+        self.assertFalse(SearchOutbox.objects.exists())
+
+        self.author.name = "Octavia E. Butler"
+        self.author.save()
+
+        index_ids, delete_ids = coalesce(SearchOutbox.objects.all())
+        self.assertEqual(index_ids, {book.id for book in self.books})
+        self.assertEqual(delete_ids, set())
+        authors = {action["_source"]["author_name"] for action in build_actions(index_ids, delete_ids)}
+        self.assertEqual(authors, {"Octavia E. Butler"})
+
+    def drain(self, bulk):
+        with mock.patch("elasticsearch.helpers.bulk", bulk):
+            return drain(self.service)
+
+    def test_drain_deletes_the_batch_and_requeues_transient_rejections(self):
+        first, second, third = self.books
+
+        def bulk(client, actions, **kwargs):
+            # Claimed before the request, and the row locks are already released
+            self.assertFalse(SearchOutbox.objects.filter(claimed_until__isnull=True).exists())
+            return 1, [
+                {"index": {"_id": str(first.id), "status": 429}},
+                {"index": {"_id": str(second.id), "status": 400}},
+            ]
+
+        with self.assertLogs("apps.common.search_outbox", "ERROR"):
+            drained = self.drain(bulk)
+
+        self.assertEqual(drained, 3)
+        self.assertEqual(list(SearchOutbox.objects.values_list("object_id", "action", "claimed_until")), [
+            (first.id, SearchOutbox.INDEX, None),
+        ])
+        self.assertEqual(self.service.breaker.failures, 0)
+
+    def test_unreachable_elasticsearch_releases_the_batch_and_trips_the_breaker(self):
+        with self.assertRaises(ESConnectionError):
+            self.drain(mock.Mock(side_effect=ESConnectionError("ElasticSearch is down")))
+
+        self.assertEqual(SearchOutbox.objects.filter(claimed_until__isnull=True).count(), 3)
+        self.assertEqual(self.service.breaker.failures, 1)
+
+    def test_claimed_events_are_skipped_by_other_workers(self):
+        self.assertEqual(len(claim(2)), 2)
+        self.assertEqual(len(claim(2)), 1)
+        self.assertEqual(claim(2), [])
+
+    def test_fixture_loads_are_not_queued(self):
+        SearchOutbox.objects.all().delete()
+        call_command("loaddata", DATA_FIXTURE, verbosity=0)
+
+        self.assertTrue(Book.objects.count() > 3)
+        self.assertFalse(SearchOutbox.objects.exists())
+
+    @override_settings(SEARCH_OUTBOX_ENABLED=False)
+    def test_nothing_is_queued_when_disabled(self):
+        SearchOutbox.objects.all().delete()
+        self.books[0].save()
+        self.assertFalse(SearchOutbox.objects.exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHES, SEARCH_BACKEND="fulltext")
+class SearchResultCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(name="Ursula K. Le Guin", country="USA")
+        for i in range(15):
+            Book.objects.create(author=cls.author, name=f"Earthsea {i:02d}", summary="Summary", published_at=date(1968, 1, 1))
+
+    def setUp(self):
+        cache.clear()
+        # Full-text search needs PostgreSQL, match names instead
+        patcher = mock.patch.object(search_service, "database_search", side_effect=lambda query, backend: (
+            Book.objects.filter(name__icontains=query).annotate(headline=Value("")).order_by("name")
+        ))
+        self.database_search = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def names(self, page):
+        return [row[1] for row in page.object_list]
+
+    def test_same_normalized_query_and_page_is_served_from_cache(self):
+        first = search_service.search_page("earthsea", "2", 10)
+
+        with self.assertNumQueries(0):
+            cached = search_service.search_page("  EarthSea ", 2, 10)
+
+        self.assertEqual(self.database_search.call_count, 1)
+        self.assertEqual(self.names(cached), self.names(first))
+        self.assertEqual(cached.number, 2)
+        self.assertEqual(cached.paginator.count, 15)
+        self.assertFalse(cached.has_next())
+
+    def test_pages_are_cached_separately(self):
+        search_service.search_page("earthsea", 1, 10)
+        second = search_service.search_page("earthsea", 2, 10)
+
+        self.assertEqual(self.database_search.call_count, 2)
+        self.assertEqual(len(second.object_list), 5)
+
+    def test_book_changes_invalidate_cached_results(self):
+        search_service.search_page("earthsea", 1, 10)
+        with self.captureOnCommitCallbacks(execute=True):
+            Book.objects.create(author=self.author, name="Earthsea 15", summary="Summary", published_at=date(1990, 1, 1))
+
+        page = search_service.search_page("earthsea", 1, 10)
+
+        self.assertEqual(self.database_search.call_count, 2)
+        self.assertEqual(page.paginator.count, 16)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, USE_CACHE=True)
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(name="Italo Calvino", country="Italy")
+        cls.book = Book.objects.create(
+            author=cls.author, name="Invisible Cities", summary="Summary", published_at=date(1972, 1, 1)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def revalidate(self, url):
+        etag = self.client.get(url)["ETag"]
+        return etag, self.client.get(url, headers={"if-none-match": etag})
+
+    def test_unchanged_page_is_not_modified_without_queries(self):
+        url = reverse("books:show", kwargs={"book_id": self.book.id})
+        # The first render caches the book and its reviews, whose tags make up the ETag
+        self.assertFalse(self.client.get(url).has_header("ETag"))
+        etag = self.client.get(url)["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, headers={"if-none-match": etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertIn("Cookie", response["Vary"])
+        self.assertIn("private", response["Cache-Control"])
+
+    def test_changes_the_page_depends_on_change_the_etag(self):
+        url = reverse("authors:show", kwargs={"author_id": self.author.id})
+        etag, response = self.revalidate(url)
+        self.assertEqual(response.status_code, 304)
+
+        self.author.name = "Italo Calvino Mameli"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.save()
+
+        response = self.client.get(url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_etag_only_moves_once_the_change_commits(self):
+        urls = [
+            reverse("stats:index"),
+            reverse("books:show", kwargs={"book_id": self.book.id}),
+            reverse("authors:show", kwargs={"author_id": self.author.id}),
+        ]
+        for url in urls:
+            self.client.get(url)
+        etags = [self.client.get(url)["ETag"] for url in urls]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(book=self.book, review="Dazzling", score=5, user=User.objects.create_user("reader"))
+            self.book.name = "Le città invisibili"
+            self.book.save()
+            self.assertEqual([self.client.get(url)["ETag"] for url in urls], etags)
+
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url, headers={"if-none-match": etag}).status_code, 200)
+
+    def test_etag_differs_per_user(self):
+        url = reverse("books:index")
+        anonymous_etag = self.client.get(url)["ETag"]
+
+        self.client.force_login(User.objects.create_user("reader"))
+        response = self.client.get(url, headers={"if-none-match": anonymous_etag})
+
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(USE_CACHE=False)
+    def test_no_etag_without_the_shared_cache(self):
+        response = self.client.get(reverse("stats:index"))
+        self.assertFalse(response.has_header("ETag"))
@@ -0,0 +1,227 @@
+"""
+Two-tier cache: a small in-process LRU in front of the shared (Redis) cache
+
+Reads are served from the worker's memory when possible and fall back to
+the shared cache. Writes go to both tiers. Deletes and counter increments
+(used by the tag generations in cache_utils) are broadcast over Redis
+pub/sub so every worker drops its local copy; entries also expire locally
+after LOCAL_CACHE_TTL seconds, which bounds staleness if a message is missed.
+
+Values returned from the local tier are shared between requests of the
+same worker and must be treated as read-only.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+from apps.common import metrics
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "cache-invalidation"
+
+_MISSING = object()
+
+
+class LocalLRUCache:
+    """Thread-safe, size-bounded LRU with a per-entry TTL"""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return _MISSING
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        # DEFAULT_TIMEOUT and None (never expire) both keep the local TTL
+        ttl = self.ttl if timeout is None or timeout is DEFAULT_TIMEOUT else min(self.ttl, timeout)
+        if ttl <= 0:
+            self.delete(key)
+            return
+
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class TwoTierCache:
+    """
+    Cache facade with the subset of the Django cache API used by cache_utils
+
+    Tier hits and misses are counted as cache.local.* and cache.redis.*
+    in apps.common.metrics.
+    """
+
+    def __init__(self, shared, local=None):
+        self.shared = shared
+        self.local = local
+        self._subscriber = None
+        self._subscriber_lock = threading.Lock()
+
+    def get(self, key, default=None):
+        if self.local is not None:
+            value = self.local.get(key)
+            if value is not _MISSING:
+                metrics.increment("cache.local.hit")
+                return value
+            metrics.increment("cache.local.miss")
+
+        value = self.shared.get(key, _MISSING)
+        if value is _MISSING:
+            metrics.increment("cache.redis.miss")
+            return default
+
+        metrics.increment("cache.redis.hit")
+        if self.local is not None:
+            self._ensure_subscriber()
+            self.local.set(key, value)
+        return value
+
+    def get_many(self, keys):
+        found = {}
+        remaining = []
+
+        for key in keys:
+            value = self.local.get(key) if self.local is not None else _MISSING
+            if value is _MISSING:
+                remaining.append(key)
+            else:
+                found[key] = value
+
+        if self.local is not None:
+            metrics.increment("cache.local.hit", len(found))
+            metrics.increment("cache.local.miss", len(remaining))
+
+        if remaining:
+            shared_found = self.shared.get_many(remaining)
+            metrics.increment("cache.redis.hit", len(shared_found))
+            metrics.increment("cache.redis.miss", len(remaining) - len(shared_found))
+
+            if self.local is not None and shared_found:
+                self._ensure_subscriber()
+                for key, value in shared_found.items():
+                    self.local.set(key, value)
+            found.update(shared_found)
+
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        self.shared.set(key, value, timeout)
+        if self.local is not None:
+            self._ensure_subscriber()
+            self.local.set(key, value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT):
+        self.shared.set_many(data, timeout)
+        if self.local is not None:
+            self._ensure_subscriber()
+            for key, value in data.items():
+                self.local.set(key, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT):
+        # Only the shared tier decides whether the key already exists
+        added = self.shared.add(key, value, timeout)
+        if self.local is not None:
+            self.local.delete(key)
+        return added
+
+    def delete(self, key):
+        self.shared.delete(key)
+        self._invalidate_local(key)
+
+    def incr(self, key, delta=1):
+        value = self.shared.incr(key, delta)
+        self._invalidate_local(key)
+        return value
+
+    def _invalidate_local(self, key):
+        if self.local is None:
+            return
+
+        self.local.delete(key)
+        try:
+            self._redis().publish(INVALIDATION_CHANNEL, key)
+        except Exception as e:
+            logger.warning(f"Failed to publish cache invalidation for {key}: {e}")
+
+    def _redis(self):
+        from django_redis import get_redis_connection
+        return get_redis_connection("default")
+
+    def _ensure_subscriber(self):
+        """Start the background thread applying invalidations from other workers"""
+        if self._subscriber is not None and self._subscriber.is_alive():
+            return
+
+        with self._subscriber_lock:
+            if self._subscriber is not None and self._subscriber.is_alive():
+                return
+            self._subscriber = threading.Thread(
+                target=self._listen, name="cache-invalidation-listener", daemon=True
+            )
+            self._subscriber.start()
+
+    def _listen(self):
+        backoff = 1
+        while True:
+            try:
+                pubsub = self._redis().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                backoff = 1
+                for message in pubsub.listen():
+                    key = message.get("data")
+                    if isinstance(key, bytes):
+                        key = key.decode()
+                    self.local.delete(key)
+            except Exception as e:
+                logger.warning(f"Cache invalidation listener disconnected: {e}")
+
+            # Messages may have been missed while disconnected
+            self.local.clear()
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+
+def build_cache(shared):
+    """
+    Wrap the shared cache with a local tier when enabled
+
+    The local tier needs Redis pub/sub to stay coherent, so it is only
+    enabled together with the Redis cache (USE_CACHE).
+    """
+    if not getattr(settings, "LOCAL_CACHE_ENABLED", False):
+        return TwoTierCache(shared)
+
+    local = LocalLRUCache(
+        max_entries=getattr(settings, "LOCAL_CACHE_MAX_ENTRIES", 1024),
+        ttl=getattr(settings, "LOCAL_CACHE_TTL", 5),
+    )
+    return TwoTierCache(shared, local)
@@ -6,4 +6,5 @@ app_name = "common"
 
 urlpatterns = [
     path("", views.home, name="home"),
+    path("metrics/", views.metrics, name="metrics"),
 ]
@@ -1,7 +1,12 @@
 from django.contrib.auth import login
+from django.contrib.auth.decorators import user_passes_test
 from django.contrib.auth.forms import UserCreationForm
+from django.http import JsonResponse
 from django.shortcuts import redirect, render
 
+from apps.common import metrics as app_metrics
+from apps.common.search_service import search_service
+
 
 def signup(request):
     if request.method == "POST":
@@ -17,3 +22,16 @@ def signup(request):
 
 def home(request):
     return render(request, "home.html")
+
+
+@user_passes_test(lambda user: user.is_superuser)
+def metrics(request):
+    """Expose the cache and search counters of the worker serving the request"""
+    data = app_metrics.snapshot()
+    data["ratios"] = {
+        "cache.local.hit_ratio": app_metrics.ratio("cache.local.hit", "cache.local.miss"),
+        "cache.redis.hit_ratio": app_metrics.ratio("cache.redis.hit", "cache.redis.miss"),
+        "search.cache.hit_ratio": app_metrics.ratio("search.cache.hit", "search.cache.miss"),
+    }
+    data["search"] = {"breaker": search_service.breaker.state}
+    return JsonResponse(data)
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F
+
+from apps.common.cache_utils import invalidate_tags
+from apps.reviews.models import Review
+
+
+class Command(BaseCommand):
+    help = 'Check the denormalized Review.up_votes counter against the ReviewUpvote rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Write the counted upvotes back to the drifted reviews',
+        )
+
+    def handle(self, *args, **options):
+        drifted = (
+            Review.objects
+            .annotate(counted_up_votes=Count('reviewupvotes'))
+            .exclude(up_votes=F('counted_up_votes'))
+            .only('id', 'book_id', 'up_votes')
+        )
+
+        mismatches = 0
+        for review in drifted.iterator():
+            mismatches += 1
+            self.stdout.write(
+                f'Review {review.id}: stored {review.up_votes}, actual {review.counted_up_votes}'
+            )
+            if options['fix']:
+                Review.objects.filter(pk=review.pk).update(up_votes=review.counted_up_votes)
+                invalidate_tags(f"review:{review.id}", f"reviews-of:{review.book_id}")
+
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('All upvote counters are consistent'))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f'Fixed {mismatches} upvote counters'))
+        else:
+            self.stdout.write(self.style.WARNING(f'{mismatches} upvote counters drifted, run with --fix to repair'))
@@ -1,11 +1,12 @@
 from django.contrib.auth.models import User
-from django.db import IntegrityError, models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import Greatest, RowNumber
 
 from apps.books.models import Book
+from apps.common.cache_utils import cache, get_cache_key, get_generation_key, get_generations, get_many_from_cache_or_db, invalidate_tags, set_tagged
 
 
-from apps.common.cache_utils import cached_method, get_cache_key, invalidate_cache, cache
-
 class Review(models.Model):
     book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name="reviews")
     review = models.TextField()
@@ -22,35 +23,45 @@ class Review(models.Model):
     def __str__(self) -> str:
         return f"{self.book.name}:{self.score}"
 
+    def save(self, *args, **kwargs):
+        # Signal handlers shift BookStats / AuthorStats, commit the deltas together with the row
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     def add_upvote(self, user):
         try:
-            ReviewUpvote.objects.create(review=self, user=user)
-            invalidate_cache("review_score", self.id)
-            return True
+            with transaction.atomic():
+                ReviewUpvote.objects.create(review=self, user=user)
+                self._apply_up_votes_delta(1)
         except IntegrityError:
             return False
+        return True
 
     def remove_upvote(self, user):
-        try:
-            upvote = ReviewUpvote.objects.get(review=self, user=user)
-            upvote.delete()
-            invalidate_cache("review_score", self.id)
-            return True
-        except ReviewUpvote.DoesNotExist:
-            return False
+        with transaction.atomic():
+            deleted, _ = ReviewUpvote.objects.filter(review=self, user=user).delete()
+            if not deleted:
+                return False
+            self._apply_up_votes_delta(-1)
+        return True
 
-    def recompute_up_votes_count(self):
-        # Get from cache or compute
-        cache_key = get_cache_key("review_score", self.id)
-        cached_count = cache.get(cache_key)
-
-        if cached_count is None:
-            count = self.reviewupvotes.count()
-            cache.set(cache_key, count, 300)  # Cache for 5 minutes
-            self.up_votes = count
-        else:
-            self.up_votes = cached_count
+    def _apply_up_votes_delta(self, delta):
+        """
+        Shift the denormalized up_votes counter with a single atomic UPDATE
+        and drop the cached review once the new count is committed
+        """
+        Review.objects.filter(pk=self.pk).update(up_votes=Greatest(F("up_votes") + delta, 0))
+        self.up_votes = max(self.up_votes + delta, 0)
 
+        tag = f"review:{self.pk}"
+        transaction.on_commit(lambda: invalidate_tags(tag))
+
+    def recompute_up_votes_count(self):
+        """
+        Rebuild up_votes from the ReviewUpvote rows.
+        Only used to repair drift, the request path keeps the counter current with deltas.
+        """
+        self.up_votes = self.reviewupvotes.count()
         self.save(update_fields=["up_votes"])
 
 
@@ -61,3 +72,86 @@ class ReviewUpvote(models.Model):
 
     class Meta:
         unique_together = ("review", "user")
+
+
+def get_book_reviews(book_id):
+    """
+    Reviews of a book in display order, served from the cache in two round trips
+
+    The ordered review ids of the book are cached under book_reviews:<book_id>
+    (tagged reviews-of:<book_id>), the reviews themselves under review:<id>.
+    A warm read is one GET of the id list and one MGET of the reviews
+    together with the generations of every tag involved; stale or missing
+    reviews are loaded with a single id__in query.
+    """
+    ids_cache_key = f"book_reviews:{book_id}"
+    list_tag = f"reviews-of:{book_id}"
+    entry = cache.get(ids_cache_key)
+
+    review_ids = reviews = None
+    if isinstance(entry, tuple) and len(entry) == 2:
+        review_ids, list_generations = entry
+        review_keys = {get_cache_key("review", review_id): review_id for review_id in review_ids}
+        found = cache.get_many([get_generation_key(list_tag), *review_keys, *map(get_generation_key, review_keys)])
+
+        if found.get(get_generation_key(list_tag)) != list_generations.get(list_tag):
+            review_ids = None
+        else:
+            # Review entries are tagged with their own key only, see get_many_from_cache_or_db
+            reviews = {
+                review_id: found[key][0]
+                for key, review_id in review_keys.items()
+                if isinstance(found.get(key), tuple) and found[key][1] == {key: found.get(get_generation_key(key))}
+            }
+
+    if review_ids is None:
+        tag_generations = get_generations([list_tag])
+        review_ids = list(Review.objects.filter(book_id=book_id).values_list("id", flat=True))
+        set_tagged(ids_cache_key, review_ids, tag_generations)
+        reviews = {}
+
+    missing_ids = [review_id for review_id in review_ids if review_id not in reviews]
+    if missing_ids:
+        reviews.update(get_many_from_cache_or_db(
+            "review",
+            missing_ids,
+            lambda missing: Review.objects.select_related("user").in_bulk(missing),
+        ))
+    return [reviews[review_id] for review_id in review_ids if review_id in reviews]
+
+
+def get_best_and_worst_reviews(book_ids):
+    """
+    Text of the best and the worst review of each book, resolved in SQL
+
+    The best review has the highest score (then the most upvotes), the
+    worst the lowest score (then the most upvotes). Both are picked with
+    ROW_NUMBER() over each book's reviews in a subquery that only reads the
+    ranking columns, so the review text is fetched for at most two reviews
+    per book, in a single query.
+
+    Returns:
+        dict: (best review, worst review) per book id, books without reviews are left out
+    """
+    ranked = (
+        Review.objects
+        .filter(book_id__in=book_ids)
+        .annotate(
+            best=Window(RowNumber(), partition_by=F("book_id"), order_by=[F("score").desc(), F("up_votes").desc(), F("id").asc()]),
+            worst=Window(RowNumber(), partition_by=F("book_id"), order_by=[F("score").asc(), F("up_votes").desc(), F("id").asc()]),
+        )
+        .filter(Q(best=1) | Q(worst=1))
+    )
+    rows = Review.objects.filter(pk__in=ranked.values("pk")).values_list("book_id", "id", "score", "up_votes", "review")
+
+    candidates = {}
+    for book_id, *review in rows:
+        candidates.setdefault(book_id, []).append(review)
+
+    return {
+        book_id: (
+            max(reviews, key=lambda r: (r[1], r[2], -r[0]))[3],
+            min(reviews, key=lambda r: (r[1], -r[2], r[0]))[3],
+        )
+        for book_id, reviews in candidates.items()
+    }
@@ -1,57 +1,18 @@
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.core.cache import cache
 
-from apps.common.cache_utils import invalidate_cache
-from .models import Review, ReviewUpvote
+from apps.common.cache_utils import invalidate_tags
+from .models import Review
 
 
 @receiver(post_save, sender=Review)
-def review_save_handler(sender, instance, **kwargs):
-    """
-    Invalidate review cache when a review is saved or updated
-    """
-    # Invalidate individual review cache
-    invalidate_cache("review", instance.id)
-    invalidate_cache("review_score", instance.id)
-    
-    # Invalidate book reviews cache
-    invalidate_cache("book_reviews", instance.book_id)
-    cache.delete(f"book_reviews:{instance.book_id}")
-    
-    # The book's score/ratings might have changed
-    invalidate_cache("book", instance.book_id)
-
-
 @receiver(post_delete, sender=Review)
-def review_delete_handler(sender, instance, **kwargs):
-    """
-    Invalidate review cache when a review is deleted
-    """
-    # Invalidate individual review cache
-    invalidate_cache("review", instance.id)
-    invalidate_cache("review_score", instance.id)
-    
-    # Invalidate book reviews cache
-    invalidate_cache("book_reviews", instance.book_id)
-    cache.delete(f"book_reviews:{instance.book_id}")
-    
-    # The book's score/ratings might have changed
-    invalidate_cache("book", instance.book_id)
-
-
-@receiver(post_save, sender=ReviewUpvote)
-@receiver(post_delete, sender=ReviewUpvote)
-def review_upvote_handler(sender, instance, **kwargs):
+def review_change_handler(sender, instance, **kwargs):
     """
-    Invalidate review score cache when upvotes change
+    Invalidate the cached reviews of a book when one of them is saved, updated or deleted
     """
-    # Get the review object
-    review = instance.review
-    
-    # Invalidate review score cache
-    invalidate_cache("review_score", review.id)
-    
-    # Invalidate book reviews cache as review scores changed
-    invalidate_cache("book_reviews", review.book_id)
-    cache.delete(f"book_reviews:{review.book_id}")
+    # Captured now, deleting clears instance.id before the callback runs
+    tags = (f"review:{instance.id}", f"reviews-of:{instance.book_id}")
+    # After commit so a concurrent reader cannot re-cache the previous rows
+    transaction.on_commit(lambda: invalidate_tags(*tags))
@@ -1,2 +1,137 @@
-# This file is required for Django app configuration
-# Tests will be added as needed
+from datetime import date
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from apps.authors.models import Author
+from apps.books.models import Book
+from apps.common import cache_utils
+from apps.common.cache_utils import invalidate_cache
+from apps.reviews.models import Review, get_best_and_worst_reviews, get_book_reviews
+
+
+class BestAndWorstReviewsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("reader")
+        author = Author.objects.create(name="Jorge Luis Borges", country="Argentina")
+        cls.ficciones, cls.aleph, cls.unreviewed = [
+            Book.objects.create(author=author, name=name, summary="Summary", published_at=date(1944, 1, 1))
+            for name in ("Ficciones", "El Aleph", "Unreviewed")
+        ]
+
+    def review(self, book, text, score, up_votes=0):
+        return Review.objects.create(book=book, review=text, score=score, up_votes=up_votes, user=self.user)
+
+    def test_upvotes_break_score_ties_in_both_directions(self):
+        self.review(self.ficciones, "Good", 4, up_votes=9)
+        self.review(self.ficciones, "Best", 5, up_votes=1)
+        self.review(self.ficciones, "Best, most voted", 5, up_votes=3)
+        self.review(self.ficciones, "Worst", 1, up_votes=0)
+        self.review(self.ficciones, "Worst, most voted", 1, up_votes=2)
+        self.review(self.aleph, "Only review", 3)
+
+        with self.assertNumQueries(1):
+            reviews = get_best_and_worst_reviews([self.ficciones.id, self.aleph.id, self.unreviewed.id])
+
+        self.assertEqual(reviews, {
+            self.ficciones.id: ("Best, most voted", "Worst, most voted"),
+            self.aleph.id: ("Only review", "Only review"),
+        })
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class UpvoteInvalidationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("reader")
+        author = Author.objects.create(name="Clarice Lispector", country="Brazil")
+        book = Book.objects.create(author=author, name="The Hour of the Star", summary="Summary", published_at=date(1977, 1, 1))
+        cls.review = Review.objects.create(book=book, review="Moving", score=5, user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_review_is_dropped_once_the_new_count_commits(self):
+        cached = get_book_reviews(self.review.book_id)[0]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.review.add_upvote(self.user)
+            # Still the old entry until the transaction commits
+            self.assertEqual(get_book_reviews(self.review.book_id)[0].up_votes, cached.up_votes)
+
+        self.assertEqual(get_book_reviews(self.review.book_id)[0].up_votes, 1)
+
+    def test_warm_reviews_cost_two_cache_round_trips(self):
+        get_book_reviews(self.review.book_id)
+
+        with mock.patch.object(cache_utils.cache, "get", wraps=cache_utils.cache.get) as get, \
+                mock.patch.object(cache_utils.cache, "get_many", wraps=cache_utils.cache.get_many) as get_many, \
+                self.assertNumQueries(0):
+            reviews = get_book_reviews(self.review.book_id)
+
+        self.assertEqual([review.review for review in reviews], ["Moving"])
+        self.assertEqual((get.call_count, get_many.call_count), (1, 1))
+
+    def test_edited_review_is_reloaded_alone(self):
+        get_book_reviews(self.review.book_id)
+        Review.objects.filter(pk=self.review.pk).update(review="Devastating")
+        invalidate_cache("review", self.review.pk)
+
+        with self.assertNumQueries(1):
+            reviews = get_book_reviews(self.review.book_id)
+
+        self.assertEqual([review.review for review in reviews], ["Devastating"])
+
+
+class UpvoteCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author_user = User.objects.create_user("author")
+        cls.voters = [User.objects.create_user(f"voter{i}") for i in range(2)]
+        author = Author.objects.create(name="Julio Cortázar", country="Argentina")
+        book = Book.objects.create(author=author, name="Rayuela", summary="Summary", published_at=date(1963, 1, 1))
+        cls.review = Review.objects.create(book=book, review="Playful", score=5, user=cls.author_user)
+
+    def up_votes(self):
+        return Review.objects.values_list("up_votes", flat=True).get(pk=self.review.pk)
+
+    def test_upvotes_shift_the_counter(self):
+        self.assertTrue(self.review.add_upvote(self.voters[0]))
+        self.assertTrue(self.review.add_upvote(self.voters[1]))
+        self.assertFalse(self.review.add_upvote(self.voters[1]))
+        self.assertEqual(self.up_votes(), 2)
+
+        self.assertTrue(self.review.remove_upvote(self.voters[0]))
+        self.assertFalse(self.review.remove_upvote(self.voters[0]))
+        self.assertEqual(self.up_votes(), 1)
+
+    def test_counter_does_not_go_below_zero(self):
+        self.review.add_upvote(self.voters[0])
+        Review.objects.filter(pk=self.review.pk).update(up_votes=0)
+
+        self.review.remove_upvote(self.voters[0])
+
+        self.assertEqual(self.up_votes(), 0)
+
+    def test_check_upvote_counts_reports_and_fixes_drift(self):
+        self.review.add_upvote(self.voters[0])
+        Review.objects.filter(pk=self.review.pk).update(up_votes=5)
+
+        out = StringIO()
+        call_command("check_upvote_counts", stdout=out)
+        self.assertIn(f"Review {self.review.id}: stored 5, actual 1", out.getvalue())
+        self.assertEqual(self.up_votes(), 5)
+
+        out = StringIO()
+        call_command("check_upvote_counts", fix=True, stdout=out)
+        self.assertIn("Fixed 1 upvote counters", out.getvalue())
+        self.assertEqual(self.up_votes(), 1)
+
+        out = StringIO()
+        call_command("check_upvote_counts", stdout=out)
+        self.assertIn("All upvote counters are consistent", out.getvalue())
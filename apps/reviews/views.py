@@ -6,7 +6,7 @@ from django.views.decorators.http import require_POST
 from apps.books.models import Book
 from apps.common.utils import render_book_detail
 
-from .models import Review
+from .models import Review, get_book_reviews
 
 
 @login_required
@@ -26,7 +26,7 @@ def create_review(request: HttpRequest, book_id: int) -> HttpResponse:
         errors["score"] = "Invalid score"
 
     if errors:
-        reviews = book.reviews.all().order_by("-up_votes", "-score")
+        reviews = get_book_reviews(book.id)
         return render_book_detail(
             request,
             book,
@@ -44,9 +44,7 @@ def create_review(request: HttpRequest, book_id: int) -> HttpResponse:
 @require_POST
 def upvote_review(request: HttpRequest, review_id: int) -> HttpResponse:
     review = get_object_or_404(Review, id=review_id)
-    success = review.add_upvote(user=request.user)
-    if success:
-        review.recompute_up_votes_count()
+    review.add_upvote(user=request.user)
 
     return redirect("books:show", book_id=review.book_id)
 
@@ -55,9 +53,7 @@ def upvote_review(request: HttpRequest, review_id: int) -> HttpResponse:
 @require_POST
 def delete_upvote_review(request: HttpRequest, review_id: int) -> HttpResponse:
     review = get_object_or_404(Review, id=review_id)
-    success = review.remove_upvote(user=request.user)
-    if success:
-        review.recompute_up_votes_count()
+    review.remove_upvote(user=request.user)
 
     return redirect("books:show", book_id=review.book_id)
 
@@ -85,7 +81,7 @@ def edit_review(request: HttpRequest, review_id: int) -> HttpResponse:
             review.save(update_fields=["review", "score"])
             return redirect("books:show", book_id=review.book_id)
         book = review.book
-        reviews = book.reviews.all()
+        reviews = get_book_reviews(book.id)
         return render(
             request,
             "books/books_show.html",
@@ -100,7 +96,7 @@ def edit_review(request: HttpRequest, review_id: int) -> HttpResponse:
         )
     # GET: show inline edit form within book page
     book = review.book
-    reviews = book.reviews.all()
+    reviews = get_book_reviews(book.id)
     return render(
         request,
         "books/books_show.html",
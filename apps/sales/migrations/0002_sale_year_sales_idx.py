@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0008_book_name_upper_prefix'),
+        ('sales', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='sale',
+            name='sales_sale_year_1ca25a_idx',
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['year', '-sales', 'book'], name='sale_year_sales_idx'),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 
 from apps.books.models import Book
 
@@ -13,5 +13,11 @@ class Sale(models.Model):
         ordering = ["-year"]
         indexes = [
             models.Index(fields=["book", "year"]),
-            models.Index(fields=["year"]),
+            # Per-year leaderboards: ROW_NUMBER() OVER (PARTITION BY year ORDER BY sales DESC)
+            models.Index(fields=["year", "-sales", "book"], name="sale_year_sales_idx"),
         ]
+
+    def save(self, *args, **kwargs):
+        # Signal handlers shift BookStats / AuthorStats, commit the deltas together with the row
+        with transaction.atomic():
+            super().save(*args, **kwargs)
@@ -0,0 +1,28 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.books.models import Book
+from apps.common.cache_utils import invalidate_cache
+from .models import Sale
+
+
+@receiver(post_save, sender=Sale)
+@receiver(post_delete, sender=Sale)
+def sale_change_handler(sender, instance, **kwargs):
+    """
+    Invalidate the cached book and author when a sale changes,
+    both render totals derived from the sales rows
+    """
+    if kwargs.get("raw"):
+        return
+
+    author_id = Book.objects.filter(pk=instance.book_id).values_list("author_id", flat=True).first()
+
+    def invalidate():
+        # Runs after commit so a concurrent reader cannot re-cache the pre-delta total
+        invalidate_cache("book", instance.book_id)
+        if author_id is not None:
+            invalidate_cache("author", author_id)
+
+    transaction.on_commit(invalidate)
@@ -1 +1,68 @@
-# Tests will be implemented here
+from datetime import date
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from apps.authors.models import Author
+from apps.books.models import MAX_POSITIVE_INT, Book
+from apps.sales.models import Sale
+
+
+class TotalSalesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("clerk")
+        author = Author.objects.create(name="Mario Vargas Llosa", country="Peru")
+        cls.book = Book.objects.create(
+            author=author, name="La ciudad y los perros", summary="Summary", published_at=date(1963, 1, 1)
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def total_sales(self):
+        return Book.objects.values_list("total_sales", flat=True).get(pk=self.book.pk)
+
+    def test_create_update_and_delete_shift_the_total(self):
+        self.client.post(reverse("sales:create", args=[self.book.id]), {"year": 2000, "sales": 100})
+        self.client.post(reverse("sales:create", args=[self.book.id]), {"year": 2001, "sales": 50})
+        self.assertEqual(self.total_sales(), 150)
+
+        sale = Sale.objects.get(book=self.book, year=2000)
+        self.client.post(reverse("sales:update", args=[self.book.id, sale.id]), {"year": 2002, "sales": 30})
+        self.assertEqual(self.total_sales(), 80)
+
+        self.client.post(reverse("sales:delete", args=[self.book.id, sale.id]))
+        self.assertEqual(self.total_sales(), 50)
+
+    def test_invalid_sale_leaves_the_total_alone(self):
+        response = self.client.post(reverse("sales:create", args=[self.book.id]), {"year": 2000, "sales": -5})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.total_sales(), 0)
+
+    def test_delta_is_clamped_to_the_column_range(self):
+        self.book.apply_sales_delta(-10)
+        self.assertEqual(self.total_sales(), 0)
+
+        self.book.apply_sales_delta(MAX_POSITIVE_INT)
+        self.book.apply_sales_delta(1)
+        self.assertEqual(self.total_sales(), MAX_POSITIVE_INT)
+
+    def test_reconcile_repairs_a_drifted_total(self):
+        Sale.objects.create(book=self.book, year=2000, sales=40)
+        Sale.objects.create(book=self.book, year=2001, sales=2)
+        Book.objects.filter(pk=self.book.pk).update(total_sales=7)
+
+        out = StringIO()
+        call_command("reconcile_total_sales", dry_run=True, stdout=out)
+        self.assertIn("stored 7, actual 42", out.getvalue())
+        self.assertEqual(self.total_sales(), 7)
+
+        out = StringIO()
+        call_command("reconcile_total_sales", stdout=out)
+        self.assertIn("Reconciled total_sales for 1 books", out.getvalue())
+        self.assertEqual(self.total_sales(), 42)
@@ -1,27 +1,26 @@
 from datetime import datetime
 
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.http import require_POST
 
 from apps.books.models import Book
+from apps.common.pagination import CursorPaginator
 
 from .models import Sale
 
 CURRENT_YEAR = datetime.now().year
 MAX_SALES = 2147483647
+# Served by the unique (book, year) index
+SALES_ORDERING = ("-year", "id")
 
 
 def sales_index(request, book_id):
-    book = Book.objects.get(id=book_id)
-    book.recompute_total_sales()
-    sale_list = Sale.objects.filter(book_id=book_id)
-    paginator = Paginator(sale_list, 10)
-
-    page_number = request.GET.get("page")
-    sales = paginator.get_page(page_number)
+    book = get_object_or_404(Book, id=book_id)
+    paginator = CursorPaginator(Sale.objects.filter(book_id=book_id), SALES_ORDERING, 10)
+    sales = paginator.get_page(request.GET.get("cursor"))
 
     return render(
         request,
@@ -61,10 +60,8 @@ def sales_create(request: HttpRequest, book_id: int) -> HttpResponse:
         errors["sales"] = "Invalid sales amount"
 
     if errors:
-        sale_list = Sale.objects.filter(book=book).order_by("-id")
-        paginator = Paginator(sale_list, 10)
-        page_number = request.GET.get("page")
-        sales = paginator.get_page(page_number)
+        paginator = CursorPaginator(Sale.objects.filter(book=book), SALES_ORDERING, 10)
+        sales = paginator.get_page(request.GET.get("cursor"))
 
         return render(
             request,
@@ -79,7 +76,9 @@ def sales_create(request: HttpRequest, book_id: int) -> HttpResponse:
             status=400,
         )
 
-    Sale.objects.create(book=book, year=year_val, sales=sales_val)
+    with transaction.atomic():
+        Sale.objects.create(book=book, year=year_val, sales=sales_val)
+        book.apply_sales_delta(sales_val)
     return redirect("sales:index", book_id=book.id)
 
 
@@ -128,9 +127,15 @@ def sales_update(request: HttpRequest, book_id: int, sale_id: int) -> HttpRespon
                 status=400,
             )
 
-        sale.year = year_val
-        sale.sales = sales_val
-        sale.save()
+        with transaction.atomic():
+            # Lock the row so the delta is taken against the value being replaced
+            previous_sales = (
+                Sale.objects.select_for_update().values_list("sales", flat=True).get(id=sale.id)
+            )
+            sale.year = year_val
+            sale.sales = sales_val
+            sale.save()
+            book.apply_sales_delta(sales_val - previous_sales)
         return redirect("sales:index", book_id=book.id)
 
     # GET request: show edit form
@@ -150,5 +155,11 @@ def sales_update(request: HttpRequest, book_id: int, sale_id: int) -> HttpRespon
 def sales_delete(_request: HttpRequest, book_id: int, sale_id: int) -> HttpResponse:
     book = get_object_or_404(Book, id=book_id)
     sale = get_object_or_404(Sale, id=sale_id, book=book)
-    sale.delete()
+    with transaction.atomic():
+        locked_sales = (
+            Sale.objects.select_for_update().filter(id=sale.id).values_list("sales", flat=True).first()
+        )
+        if locked_sales is not None:
+            sale.delete()
+            book.apply_sales_delta(-locked_sales)
     return redirect("sales:index", book_id=book.id)
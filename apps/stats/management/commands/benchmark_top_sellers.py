@@ -0,0 +1,112 @@
+import random
+import statistics
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from apps.authors.models import Author
+from apps.books.models import Book
+from apps.sales.models import Sale
+from apps.stats.models import TOP_SELLERS_PER_YEAR, rank_top_sellers
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare ranking the top sellers of each year in Python over every sale row with the '
+        'ROW_NUMBER() window query, on synthetic sales. All synthetic rows are rolled back at the end.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--books',
+            type=int,
+            default=20000,
+            help='Synthetic books to create (default: 20000)',
+        )
+        parser.add_argument(
+            '--years',
+            type=int,
+            default=50,
+            help='Years of sales per book, books x years sale rows are created (default: 50)',
+        )
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=5,
+            help='Timed runs of each approach (default: 5)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Random seed for the synthetic data (default: 42)',
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        first_year = 2024 - options['years'] + 1
+        years = set(range(first_year, 2025))
+
+        with transaction.atomic():
+            started = time.perf_counter()
+            self._populate(rng, options['books'], first_year, options['years'])
+            self.stdout.write(
+                f'Created {options["books"] * options["years"]} sales in {time.perf_counter() - started:.1f}s'
+            )
+
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE sales_sale')
+
+            streamed = self._report('Python loop over all sales', self._python_ranking, years, options['runs'])
+            windowed = self._report('ROW_NUMBER() window query', rank_top_sellers, years, options['runs'])
+            if streamed != windowed:
+                self.stdout.write(self.style.WARNING('The two approaches ranked different books'))
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('Synthetic data rolled back'))
+
+    def _python_ranking(self, years):
+        """The ranking as stats_page used to do it"""
+        leaderboards = {year: [] for year in years}
+        rows = (
+            Sale.objects
+            .filter(year__in=years)
+            .values_list('year', 'book_id')
+            .order_by('year', '-sales', 'book_id')
+        )
+        for year, book_id in rows.iterator(chunk_size=5000):
+            if len(leaderboards[year]) < TOP_SELLERS_PER_YEAR:
+                leaderboards[year].append(book_id)
+        return leaderboards
+
+    def _report(self, label, rank, years, runs):
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            leaderboards = rank(years)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        self.stdout.write(
+            f'{label}: median {statistics.median(timings):.1f}ms, max {max(timings):.1f}ms'
+        )
+        return leaderboards
+
+    def _populate(self, rng, book_count, first_year, year_count):
+        author = Author.objects.create(name='Synthetic Author', country='Synthetic')
+        books = Book.objects.bulk_create(
+            Book(author=author, name=f'Synthetic {i}', summary='Synthetic', published_at=date(first_year, 1, 1))
+            for i in range(book_count)
+        )
+
+        batch = []
+        for book in books:
+            for year in range(first_year, first_year + year_count):
+                batch.append(Sale(book=book, year=year, sales=rng.randint(0, 100000)))
+                if len(batch) == 10000:
+                    Sale.objects.bulk_create(batch)
+                    batch = []
+        Sale.objects.bulk_create(batch)
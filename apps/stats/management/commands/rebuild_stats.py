@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.stats.models import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the BookStats and AuthorStats tables from the reviews and sales'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        books, authors = rebuild_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt stats for {books} books and {authors} authors in {time.perf_counter() - started:.1f}s'
+        ))
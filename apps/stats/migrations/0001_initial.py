@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('authors', '0006_author_author_name_trgm'),
+        ('books', '0008_book_name_upper_prefix'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='authors.author')),
+                ('number_of_books', models.PositiveIntegerField(default=0)),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('score_total', models.PositiveBigIntegerField(default=0)),
+                ('average_score', models.FloatField(null=True)),
+                ('total_sales', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BookStats',
+            fields=[
+                ('book', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='books.book')),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('score_total', models.PositiveBigIntegerField(default=0)),
+                ('average_score', models.FloatField(null=True)),
+                ('total_sales', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-average_score'], name='bookstats_average_score_idx'), models.Index(fields=['-total_sales'], name='bookstats_total_sales_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authors', '0006_author_author_name_trgm'),
+        ('stats', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='authorstats',
+            index=models.Index(fields=['number_of_books'], name='authorstats_books_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='authorstats',
+            index=models.Index(fields=['total_sales'], name='authorstats_total_sales_idx'),
+        ),
+    ]
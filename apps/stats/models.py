@@ -1 +1,209 @@
-# This module may contain model definitions in the future
+from django.db import models, transaction
+from django.db.models import Count, F, FloatField, Sum, Window
+from django.db.models.functions import Cast, Greatest, NullIf, RowNumber
+
+from apps.authors.models import Author
+from apps.books.models import Book
+from apps.common.cache_utils import get_many_from_cache_or_db, invalidate_tags
+
+# Cache tag of everything derived from reviews, sales, books and authors on /stats/
+STATS_TAG = "stats"
+
+# Size of the per-year sales leaderboards
+TOP_SELLERS_PER_YEAR = 5
+
+
+class BookStats(models.Model):
+    """
+    Review and sales aggregates of a book, kept current by apps.stats.signals
+
+    Signal handlers shift the counters with single UPDATE ... SET x = x + delta
+    statements, so /stats/ reads them instead of aggregating reviews and sales.
+    `manage.py rebuild_stats` recomputes every row from scratch.
+    """
+
+    book = models.OneToOneField(Book, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    review_count = models.PositiveIntegerField(default=0)
+    score_total = models.PositiveBigIntegerField(default=0)
+    # score_total / review_count, stored so the top rated books are read from an index
+    average_score = models.FloatField(null=True)
+    total_sales = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Top rated books skip the unreviewed (NULL) ones, which sort first in a descending index
+            models.Index(fields=["-average_score"], name="bookstats_average_score_idx"),
+            models.Index(fields=["-total_sales"], name="bookstats_total_sales_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"stats:{self.book_id}"
+
+
+class AuthorStats(models.Model):
+    """
+    Aggregates over all the books of an author, kept current by apps.stats.signals
+
+    average_score averages every review of the author's books, total_sales
+    sums every sale of them. Both are computed per table, without the
+    review x sale join that used to inflate the sales total.
+    """
+
+    author = models.OneToOneField(Author, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    number_of_books = models.PositiveIntegerField(default=0)
+    review_count = models.PositiveIntegerField(default=0)
+    score_total = models.PositiveBigIntegerField(default=0)
+    average_score = models.FloatField(null=True)
+    total_sales = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        # Sort columns of the server-side authors statistics table
+        indexes = [
+            models.Index(fields=["number_of_books"], name="authorstats_books_idx"),
+            models.Index(fields=["total_sales"], name="authorstats_total_sales_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"stats:{self.author_id}"
+
+
+def _shifted(field, delta):
+    return Greatest(F(field) + delta, 0)
+
+
+def _review_changes(count_delta, score_delta):
+    """UPDATE assignments applying a review delta, the average is derived from the shifted columns"""
+    return {
+        "review_count": _shifted("review_count", count_delta),
+        "score_total": _shifted("score_total", score_delta),
+        "average_score": (
+            Cast(_shifted("score_total", score_delta), FloatField())
+            / NullIf(_shifted("review_count", count_delta), 0)
+        ),
+    }
+
+
+def apply_review_delta(book_id, count_delta, score_delta):
+    """Add (or with negative deltas remove) reviews of a book to its stats and its author's"""
+    if not count_delta and not score_delta:
+        return
+
+    changes = _review_changes(count_delta, score_delta)
+    BookStats.objects.filter(book_id=book_id).update(**changes)
+    AuthorStats.objects.filter(author__books=book_id).update(**changes)
+
+
+def apply_sales_delta(book_id, delta):
+    """Shift the sales total of a book and its author"""
+    if not delta:
+        return
+
+    BookStats.objects.filter(book_id=book_id).update(total_sales=_shifted("total_sales", delta))
+    AuthorStats.objects.filter(author__books=book_id).update(total_sales=_shifted("total_sales", delta))
+
+
+def apply_book_delta(author_id, book_stats, sign):
+    """Add (sign=1) or remove (sign=-1) a book and its aggregates from an author's stats"""
+    review_count = book_stats.review_count if book_stats else 0
+    score_total = book_stats.score_total if book_stats else 0
+    total_sales = book_stats.total_sales if book_stats else 0
+
+    AuthorStats.objects.filter(author_id=author_id).update(
+        number_of_books=_shifted("number_of_books", sign),
+        total_sales=_shifted("total_sales", sign * total_sales),
+        **_review_changes(sign * review_count, sign * score_total),
+    )
+
+
+def rebuild_stats():
+    """
+    Recompute every BookStats and AuthorStats row from the reviews and sales
+
+    Reviews and sales are aggregated by separate grouped queries, and the
+    tables are replaced in one transaction. Deltas applied by concurrent
+    writes while it runs may be lost, run it when the data is quiet.
+
+    Returns:
+        tuple: (book rows, author rows) written
+    """
+    from apps.reviews.models import Review
+    from apps.sales.models import Sale
+
+    with transaction.atomic():
+        reviews = {
+            row["book_id"]: (row["count"], row["total"])
+            for row in Review.objects.order_by().values("book_id").annotate(count=Count("id"), total=Sum("score"))
+        }
+        sales = dict(Sale.objects.order_by().values("book_id").annotate(total=Sum("sales")).values_list("book_id", "total"))
+
+        book_stats = []
+        author_stats = {author_id: AuthorStats(author_id=author_id) for author_id in Author.objects.values_list("id", flat=True)}
+        for book_id, author_id in Book.objects.values_list("id", "author_id"):
+            review_count, score_total = reviews.get(book_id, (0, 0))
+            stats = BookStats(
+                book_id=book_id,
+                review_count=review_count,
+                score_total=score_total,
+                average_score=score_total / review_count if review_count else None,
+                total_sales=sales.get(book_id) or 0,
+            )
+            book_stats.append(stats)
+
+            author = author_stats[author_id]
+            author.number_of_books += 1
+            author.review_count += stats.review_count
+            author.score_total += stats.score_total
+            author.total_sales += stats.total_sales
+
+        for author in author_stats.values():
+            author.average_score = author.score_total / author.review_count if author.review_count else None
+
+        BookStats.objects.all().delete()
+        AuthorStats.objects.all().delete()
+        BookStats.objects.bulk_create(book_stats, batch_size=1000)
+        AuthorStats.objects.bulk_create(author_stats.values(), batch_size=1000)
+
+        transaction.on_commit(lambda: invalidate_tags(STATS_TAG))
+
+    return len(book_stats), len(author_stats)
+
+
+def top_sellers_by_year(years):
+    """
+    Best selling books of each year, best first
+
+    Each year's leaderboard is cached under sales_leaderboard:<year> and
+    dropped by the sale signals of that year. Missing years are ranked in
+    one query with ROW_NUMBER() OVER (PARTITION BY year ORDER BY sales DESC),
+    so only TOP_SELLERS_PER_YEAR rows per year leave the database.
+
+    Args:
+        years (iterable): Years to rank
+
+    Returns:
+        dict: Book ids per year, at most TOP_SELLERS_PER_YEAR each
+    """
+    return get_many_from_cache_or_db("sales_leaderboard", set(years), rank_top_sellers)
+
+
+def rank_top_sellers(years):
+    """Uncached top_sellers_by_year, years without sales get an empty leaderboard"""
+    from apps.sales.models import Sale
+
+    ranked = (
+        Sale.objects
+        .filter(year__in=years)
+        .annotate(rank=Window(
+            RowNumber(),
+            partition_by=F("year"),
+            order_by=[F("sales").desc(), F("book_id").asc()],
+        ))
+        .filter(rank__lte=TOP_SELLERS_PER_YEAR)
+        .order_by("year", "rank")
+        .values_list("year", "book_id")
+    )
+
+    leaderboards = {year: [] for year in years}
+    for year, book_id in ranked:
+        leaderboards[year].append(book_id)
+    return leaderboards
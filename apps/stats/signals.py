@@ -0,0 +1,128 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.authors.models import Author
+from apps.books.models import Book
+from apps.common.cache_utils import invalidate_cache, invalidate_tags
+from apps.reviews.models import Review, ReviewUpvote
+from apps.sales.models import Sale
+from .models import STATS_TAG, AuthorStats, BookStats, apply_book_delta, apply_review_delta, apply_sales_delta
+
+
+# Fixture loads (raw saves) are skipped, run `manage.py rebuild_stats` afterwards
+
+
+@receiver(post_save, sender=Author)
+def author_stats_create_handler(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        AuthorStats.objects.create(author=instance)
+
+
+@receiver(post_save, sender=Book)
+def book_stats_save_handler(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    if created:
+        BookStats.objects.create(book=instance)
+        apply_book_delta(instance.author_id, None, 1)
+        return
+
+    # apps.books.signals remembers the previous author, move the book's aggregates along
+    previous_author_id = getattr(instance, "_previous_author_id", None)
+    if previous_author_id and previous_author_id != instance.author_id:
+        book_stats = BookStats.objects.filter(book_id=instance.id).first()
+        apply_book_delta(previous_author_id, book_stats, -1)
+        apply_book_delta(instance.author_id, book_stats, 1)
+
+
+@receiver(post_delete, sender=Book)
+def book_stats_delete_handler(sender, instance, **kwargs):
+    # Its reviews and sales were deleted first and already subtracted themselves
+    apply_book_delta(instance.author_id, None, -1)
+
+
+@receiver(pre_save, sender=Review)
+def review_stats_pre_save_handler(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        instance._previous_stats = Review.objects.filter(pk=instance.pk).values_list("book_id", "score").first()
+
+
+@receiver(post_save, sender=Review)
+def review_stats_save_handler(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    previous = getattr(instance, "_previous_stats", None)
+    if previous:
+        previous_book_id, previous_score = previous
+        if previous_book_id != instance.book_id:
+            apply_review_delta(previous_book_id, -1, -previous_score)
+            apply_review_delta(instance.book_id, 1, instance.score)
+        else:
+            apply_review_delta(instance.book_id, 0, instance.score - previous_score)
+    else:
+        apply_review_delta(instance.book_id, 1, instance.score)
+
+
+@receiver(post_delete, sender=Review)
+def review_stats_delete_handler(sender, instance, **kwargs):
+    apply_review_delta(instance.book_id, -1, -instance.score)
+
+
+@receiver(pre_save, sender=Sale)
+def sale_stats_pre_save_handler(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        instance._previous_stats = Sale.objects.filter(pk=instance.pk).values_list("book_id", "sales", "year").first()
+
+
+@receiver(post_save, sender=Sale)
+def sale_stats_save_handler(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    previous = getattr(instance, "_previous_stats", None)
+    if previous:
+        previous_book_id, previous_sales, previous_year = previous
+        if previous_book_id != instance.book_id:
+            apply_sales_delta(previous_book_id, -previous_sales)
+            apply_sales_delta(instance.book_id, instance.sales)
+        else:
+            apply_sales_delta(instance.book_id, instance.sales - previous_sales)
+        invalidate_leaderboards(previous_year, instance.year)
+    else:
+        apply_sales_delta(instance.book_id, instance.sales)
+        invalidate_leaderboards(instance.year)
+
+
+@receiver(post_delete, sender=Sale)
+def sale_stats_delete_handler(sender, instance, **kwargs):
+    apply_sales_delta(instance.book_id, -instance.sales)
+    invalidate_leaderboards(instance.year)
+
+
+def invalidate_leaderboards(*years):
+    def invalidate():
+        # After commit, so a concurrent reader cannot re-cache the previous ranking
+        for year in set(years):
+            invalidate_cache("sales_leaderboard", year)
+
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(post_save, sender=ReviewUpvote)
+@receiver(post_delete, sender=ReviewUpvote)
+@receiver(post_save, sender=Sale)
+@receiver(post_delete, sender=Sale)
+def stats_page_handler(sender, instance, **kwargs):
+    """The stats page shows aggregates, names and review texts of all of these"""
+    # After commit, together with the stats deltas and up_votes updates, so a
+    # concurrent /stats/ request cannot render the old aggregates under the new ETag
+    transaction.on_commit(lambda: invalidate_tags(STATS_TAG))
@@ -1,2 +1,202 @@
-# This file is required for Django app configuration
-# Tests will be added as needed
+from datetime import date
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from apps.authors.models import Author
+from apps.books.models import Book
+from apps.reviews.models import Review
+from apps.sales.models import Sale
+from apps.stats.models import AuthorStats, BookStats, rebuild_stats, top_sellers_by_year
+
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class StatsTablesTests(TestCase):
+    """The incrementally maintained stats must always equal a full rebuild"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("reader")
+        cls.le_guin = Author.objects.create(name="Ursula K. Le Guin", country="USA")
+        cls.butler = Author.objects.create(name="Octavia Butler", country="USA")
+        cls.dispossessed = Book.objects.create(
+            author=cls.le_guin, name="The Dispossessed", summary="Summary", published_at=date(1974, 1, 1)
+        )
+        cls.kindred = Book.objects.create(
+            author=cls.butler, name="Kindred", summary="Summary", published_at=date(1979, 1, 1)
+        )
+
+    def snapshot(self):
+        books = {
+            row[0]: row[1:] for row in
+            BookStats.objects.values_list("book_id", "review_count", "score_total", "average_score", "total_sales")
+        }
+        authors = {
+            row[0]: row[1:] for row in AuthorStats.objects.values_list(
+                "author_id", "number_of_books", "review_count", "score_total", "average_score", "total_sales"
+            )
+        }
+        return books, authors
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        rebuild_stats()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_reviews_and_sales_update_book_and_author_stats(self):
+        review = Review.objects.create(book=self.dispossessed, review="Great", score=5, user=self.user)
+        Review.objects.create(book=self.dispossessed, review="Fine", score=2, user=self.user)
+        Review.objects.create(book=self.kindred, review="Good", score=4, user=self.user)
+        sale = Sale.objects.create(book=self.dispossessed, year=1975, sales=100)
+        Sale.objects.create(book=self.dispossessed, year=1976, sales=50)
+
+        stats = BookStats.objects.get(book=self.dispossessed)
+        self.assertEqual((stats.review_count, stats.average_score, stats.total_sales), (2, 3.5, 150))
+        # Two reviews and two sales rows must not multiply each other
+        self.assertEqual(AuthorStats.objects.get(author=self.le_guin).total_sales, 150)
+
+        review.score = 3
+        review.save()
+        sale.sales = 10
+        sale.save()
+        Review.objects.filter(book=self.kindred).delete()
+
+        stats = BookStats.objects.get(book=self.dispossessed)
+        self.assertEqual((stats.average_score, stats.total_sales), (2.5, 60))
+        self.assertIsNone(AuthorStats.objects.get(author=self.butler).average_score)
+        self.assertMatchesRebuild()
+
+    def test_moving_and_deleting_books_moves_their_aggregates(self):
+        Review.objects.create(book=self.dispossessed, review="Great", score=5, user=self.user)
+        Sale.objects.create(book=self.dispossessed, year=1975, sales=100)
+
+        self.dispossessed.author = self.butler
+        self.dispossessed.save()
+        butler = AuthorStats.objects.get(author=self.butler)
+        self.assertEqual((butler.number_of_books, butler.total_sales, butler.average_score), (2, 100, 5.0))
+        self.assertEqual(AuthorStats.objects.get(author=self.le_guin).number_of_books, 0)
+        self.assertMatchesRebuild()
+
+        self.dispossessed.delete()
+        butler = AuthorStats.objects.get(author=self.butler)
+        self.assertEqual((butler.number_of_books, butler.total_sales, butler.review_count), (1, 0, 0))
+        self.assertMatchesRebuild()
+
+    def test_stats_page_reads_the_stats_tables(self):
+        Review.objects.create(book=self.kindred, review="Good", score=4, user=self.user)
+        Sale.objects.create(book=self.kindred, year=1980, sales=70)
+        # A book whose stats row is missing (until rebuild_stats) must not outrank real sales
+        BookStats.objects.filter(book=self.dispossessed).delete()
+
+        response = self.client.get(reverse("stats:index"))
+
+        top_rated = response.context["top_rated_books"]
+        self.assertEqual([book.name for book in top_rated], ["Kindred"])
+        top_selling = response.context["top_selling_books"]
+        self.assertEqual((top_selling[0].calculated_total_sales, top_selling[0].author_total_sales), (70, 70))
+        self.assertEqual([book.name for book in top_selling], ["Kindred", "The Dispossessed"])
+
+    def test_a_failed_delta_rolls_back_the_write(self):
+        with mock.patch("apps.stats.signals.apply_review_delta", side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                Review.objects.create(book=self.kindred, review="Good", score=4, user=self.user)
+        with mock.patch("apps.stats.signals.apply_sales_delta", side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                Sale.objects.create(book=self.kindred, year=1980, sales=70)
+
+        self.assertFalse(Review.objects.exists())
+        self.assertFalse(Sale.objects.exists())
+        self.assertMatchesRebuild()
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TopSellersByYearTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(name="Terry Pratchett", country="UK")
+        cls.books = [
+            Book.objects.create(author=author, name=f"Discworld {i}", summary="Summary", published_at=date(1983, 1, 1))
+            for i in range(7)
+        ]
+        for i, book in enumerate(cls.books):
+            # Books 5 and 6 tie on sales, the lower id ranks first
+            Sale.objects.create(book=book, year=1983, sales=min(i, 5) * 10)
+            Sale.objects.create(book=book, year=1984, sales=100 - i)
+
+    def setUp(self):
+        cache.clear()
+
+    def ids(self, *indexes):
+        return [self.books[i].id for i in indexes]
+
+    def test_ranks_each_year_separately(self):
+        leaderboards = top_sellers_by_year([1983, 1984, 1999])
+
+        self.assertEqual(leaderboards[1983], self.ids(5, 6, 4, 3, 2))
+        self.assertEqual(leaderboards[1984], self.ids(0, 1, 2, 3, 4))
+        self.assertEqual(leaderboards[1999], [])
+
+    def test_leaderboards_are_cached_until_a_sale_of_the_year_changes(self):
+        top_sellers_by_year([1983, 1984])
+        with self.assertNumQueries(0):
+            top_sellers_by_year([1983, 1984])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sale = Sale.objects.get(book=self.books[0], year=1983)
+            sale.sales = 1000
+            sale.save()
+
+        with self.assertNumQueries(1):
+            leaderboards = top_sellers_by_year([1983, 1984])
+        self.assertEqual(leaderboards[1983][0], self.books[0].id)
+
+
+class AuthorsStatsDataTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user("reader")
+        for i in range(12):
+            author = Author.objects.create(name=f"Author {i:02d}", country="Chile")
+            for j in range(i % 3):
+                book = Book.objects.create(author=author, name=f"Book {i}-{j}", summary="Summary", published_at=date(2000, 1, 1))
+                Sale.objects.create(book=book, year=2001, sales=i * 10)
+                Review.objects.create(book=book, review="Review", score=1 + i % 5, user=user)
+
+    def fetch(self, **params):
+        params.setdefault("draw", "1")
+        response = self.client.get(reverse("stats:authors_data"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_pages_in_the_requested_order(self):
+        data = self.fetch(**{"start": "5", "length": "5", "order[0][column]": "4", "order[0][dir]": "desc"})
+
+        self.assertEqual(data["recordsTotal"], 12)
+        self.assertEqual(data["recordsFiltered"], 12)
+        self.assertEqual([row["rank"] for row in data["data"]], [6, 7, 8, 9, 10])
+        sales = [row["total_sales"] for row in data["data"]]
+        self.assertEqual(sales, sorted(sales, reverse=True))
+
+    def test_filters_run_in_the_database(self):
+        data = self.fetch(**{
+            "length": "100",
+            "columns[2][search][value]": ">=2",
+            "columns[4][search][value]": "<200",
+        })
+
+        self.assertEqual([row["name"] for row in data["data"]], ["Author 02", "Author 05", "Author 08"])
+        self.assertEqual(data["recordsFiltered"], 3)
+
+        data = self.fetch(**{"search[value]": "author 1"})
+        self.assertEqual([row["name"] for row in data["data"]], ["Author 10", "Author 11"])
+
+    def test_invalid_paging_and_ordering_are_rejected(self):
+        for params in ({"start": "x"}, {"order[0][column]": "\u00b2"}):
+            with self.subTest(params=params):
+                response = self.client.get(reverse("stats:authors_data"), params)
+                self.assertEqual(response.status_code, 400)
@@ -6,4 +6,5 @@ app_name = "stats"
 
 urlpatterns = [
     path("", views.stats_page, name="index"),
+    path("authors/data/", views.authors_stats_data, name="authors_data"),
 ]
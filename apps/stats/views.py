@@ -1,96 +1,142 @@
-from django.db.models import Avg, Count, Sum, OuterRef, Subquery
+import re
+
+from django.db.models import F
+from django.db.models.functions import Round
+from django.http import JsonResponse
 from django.shortcuts import render
+from django.urls import reverse
 
-from apps.authors.models import Author
 from apps.books.models import Book
-from apps.sales.models import Sale
+from apps.common.http_cache import conditional_page
+from apps.common.pagination import estimated_count
+from apps.reviews.models import get_best_and_worst_reviews
+from apps.stats.models import STATS_TAG, AuthorStats, top_sellers_by_year
+
+# DataTables column index -> AuthorStats field it sorts by, the "#" column is not sortable
+AUTHOR_ORDERING = {1: "author__name", 2: "number_of_books", 3: "average_score", 4: "total_sales"}
+# Numeric column filters compare against the value as displayed (scores have 2 decimals)
+AUTHOR_NUMERIC_FILTERS = {2: "number_of_books", 3: "display_score", 4: "total_sales"}
+NUMERIC_FILTER = re.compile(r"^(<=|>=|=|<|>)(-?\d+(?:\.\d+)?)$")
+FILTER_LOOKUPS = {"=": "exact", "<": "lt", ">": "gt", "<=": "lte", ">=": "gte"}
+AUTHORS_DATA_MAX_LENGTH = 100
 
 
+# Book and author names are shown too, renames bump books_index and authors
+@conditional_page(lambda request: [STATS_TAG, "books_index", "authors"])
 def stats_page(request):
+    # Aggregates are read from the BookStats / AuthorStats tables kept current by apps.stats.signals
     top_rated_books_qs = (
         Book.objects
-        .annotate(average_score=Avg("reviews__score"))
-        .order_by("-average_score")[:10]
+        .filter(stats__average_score__isnull=False)
+        .annotate(average_score=F("stats__average_score"))
+        .only("id", "name")
+        .order_by("-stats__average_score", "id")[:10]
     )
 
-    top_rated_books = list(
-        top_rated_books_qs.prefetch_related("reviews")
-    )
+    top_rated_books = list(top_rated_books_qs)
+    best_and_worst = get_best_and_worst_reviews([book.id for book in top_rated_books])
     for book in top_rated_books:
-        reviews = list(book.reviews.all())
-        if reviews:
-            best = max(reviews, key=lambda r: (r.score, r.up_votes))
-            worst = min(reviews, key=lambda r: (r.score, -r.up_votes))
-            book.best_review_upvotes = best.review
-            book.worst_review_upvotes = worst.review
-        else:
-            book.best_review_upvotes = "N/A"
-            book.worst_review_upvotes = "N/A"
-
-
-    authors_stats = (
-        Author.objects
-        .annotate(
-            number_of_books=Count("books", distinct=True),
-            average_score=Avg("books__reviews__score"),
-            total_sales=Sum("books__yearly_sales__sales"),
-        )
-    )
-
-    author_total_sales_subquery = (
-        Sale.objects
-        .filter(book__author=OuterRef("author"))
-        .values("book__author")
-        .annotate(total_sales=Sum("sales"))
-        .values("total_sales")
-    )
+        book.best_review_upvotes, book.worst_review_upvotes = best_and_worst.get(book.id, ("N/A", "N/A"))
 
-    top_selling_books_qs = (
+    top_selling_books = list(
         Book.objects
         .annotate(
-            calculated_total_sales=Sum("yearly_sales__sales"),
-            author_total_sales=Subquery(author_total_sales_subquery),
+            calculated_total_sales=F("stats__total_sales"),
+            author_total_sales=F("author__stats__total_sales"),
         )
-        .order_by("-calculated_total_sales")[:50]
+        # Books without a stats row sort last (PostgreSQL puts NULLs first in a descending order)
+        .order_by(F("stats__total_sales").desc(nulls_last=True), "id")
         .select_related("author")
+        .only("id", "name", "published_at", "author__id", "author__name")[:50]
     )
-    top_selling_books = list(top_selling_books_qs)
-
-    publication_years = set()
-    book_ids = []
-    for b in top_selling_books:
-        if b.published_at:
-            publication_years.add(b.published_at.year)
-        book_ids.append(b.id)
-
-    if publication_years:
-        sales_qs = (
-            Sale.objects
-            .filter(year__in=publication_years)
-            .values("year", "book_id", "sales")
-            .order_by("year", "-sales", "book_id")
-        )
-        top5_book_ids = set()
-        current_year = None
-        count_in_year = 0
-        for row in sales_qs:
-            y = row["year"]
-            if y != current_year:
-                current_year = y
-                count_in_year = 0
-            if count_in_year < 5:
-                top5_book_ids.add(row["book_id"])
-                count_in_year += 1
-    else:
-        top5_book_ids = set()
-
-    for b in top_selling_books:
-        pub_year = b.published_at.year if b.published_at else None
-        b.is_top_5_in_year = (b.id in top5_book_ids) if pub_year else False
+
+    # Per-year leaderboards ranked in SQL (window function) and cached per year
+    publication_years = {book.published_at.year for book in top_selling_books if book.published_at}
+    leaderboards = top_sellers_by_year(publication_years)
+    for book in top_selling_books:
+        book.is_top_5_in_year = bool(book.published_at) and book.id in leaderboards[book.published_at.year]
 
     context = {
         "top_rated_books": top_rated_books,
-        "authors_stats": authors_stats,
+        # The authors table itself is loaded page by page from authors_stats_data
+        "authors_count": estimated_count(AuthorStats.objects.all()),
         "top_selling_books": top_selling_books
     }
-    return render(request, "stats/stats_index.html", context)
\ No newline at end of file
+    return render(request, "stats/stats_index.html", context)
+
+
+def authors_stats_data(request):
+    """
+    Authors statistics table, DataTables server-side processing protocol
+
+    Filtering (the global search and the per-column filters), ordering and
+    paging run in SQL over the AuthorStats table, so each request returns
+    one page of rows however many authors there are. Numeric column
+    filters are an operator followed by a number, e.g. ">=3" or "=4.5".
+
+    Returns:
+        JsonResponse: draw, recordsTotal, recordsFiltered and the page rows
+    """
+    params = request.GET
+    try:
+        draw = int(params.get("draw", 0))
+        start = max(int(params.get("start", 0)), 0)
+        length = int(params.get("length", 10))
+    except ValueError:
+        return JsonResponse({"error": "Invalid paging parameters"}, status=400)
+    # DataTables asks for every row with -1
+    if length < 1 or length > AUTHORS_DATA_MAX_LENGTH:
+        length = AUTHORS_DATA_MAX_LENGTH
+
+    rows = AuthorStats.objects.all()
+    for name in (params.get("search[value]", ""), params.get("columns[1][search][value]", "")):
+        if name.strip():
+            rows = rows.filter(author__name__icontains=name.strip())
+    for index, field in AUTHOR_NUMERIC_FILTERS.items():
+        match = NUMERIC_FILTER.match(params.get(f"columns[{index}][search][value]", "").replace(" ", ""))
+        if match:
+            operator, value = match.groups()
+            if field == "display_score":
+                rows = rows.annotate(display_score=Round("average_score", 2))
+            rows = rows.filter(**{f"{field}__{FILTER_LOOKUPS[operator]}": float(value)})
+
+    ordering = []
+    for i in range(len(AUTHOR_ORDERING)):
+        column = params.get(f"order[{i}][column]")
+        if not column:
+            continue
+        try:
+            field = AUTHOR_ORDERING.get(int(column))
+        except ValueError:
+            return JsonResponse({"error": "Invalid ordering parameters"}, status=400)
+        if field:
+            descending = params.get(f"order[{i}][dir]") == "desc"
+            ordering.append(F(field).desc(nulls_last=True) if descending else F(field).asc(nulls_last=True))
+
+    # The protocol needs exact counts for paging, AuthorStats has one row per author and is cheap to count
+    total = AuthorStats.objects.count()
+    filtered = rows.count() if rows.query.where else total
+    page = (
+        rows
+        .order_by(*ordering, "author_id")
+        .values_list("author_id", "author__name", "number_of_books", "average_score", "total_sales")
+        [start:start + length]
+    )
+
+    return JsonResponse({
+        "draw": draw,
+        "recordsTotal": total,
+        "recordsFiltered": filtered,
+        "data": [
+            {
+                "rank": start + position,
+                "id": author_id,
+                "name": name,
+                "url": reverse("authors:show", args=[author_id]),
+                "number_of_books": number_of_books,
+                "average_score": average_score,
+                "total_sales": total_sales,
+            }
+            for position, (author_id, name, number_of_books, average_score, total_sales) in enumerate(page, start=1)
+        ],
+    })
@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "django.contrib.humanize",
+    "django.contrib.postgres",
     "apps.authors",
     "apps.books",
     "apps.common",
@@ -50,6 +51,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost so queries made by the other middleware are counted too
+    "apps.common.middleware.QueryInspectorMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -174,6 +177,44 @@ else:
         }
     }
 
+# Per-worker in-memory tier in front of Redis, kept coherent through Redis pub/sub
+LOCAL_CACHE_ENABLED = USE_CACHE and os.environ.get('LOCAL_CACHE_ENABLED', 'true').lower() == 'true'
+LOCAL_CACHE_MAX_ENTRIES = int(os.environ.get('LOCAL_CACHE_MAX_ENTRIES', 1024))
+LOCAL_CACHE_TTL = int(os.environ.get('LOCAL_CACHE_TTL', 5))
+
+# Per-request query count, SQL time and duplicated statements (X-DB-* headers and logs)
+QUERY_INSPECTOR_ENABLED = os.environ.get('QUERY_INSPECTOR_ENABLED', 'false').lower() == 'true'
+QUERY_INSPECTOR_WARN_QUERIES = int(os.environ.get('QUERY_INSPECTOR_WARN_QUERIES', 20))
+
 # ElasticSearch configuration
 ELASTICSEARCH_HOST = os.environ.get('ELASTICSEARCH_HOST', 'localhost')
 ELASTICSEARCH_PORT = int(os.environ.get('ELASTICSEARCH_PORT', 9200))
+# Searches give up after ELASTICSEARCH_TIMEOUT seconds; after ELASTICSEARCH_FAILURE_THRESHOLD
+# consecutive failures ElasticSearch is skipped for ELASTICSEARCH_RESET_TIMEOUT seconds
+ELASTICSEARCH_TIMEOUT = float(os.environ.get('ELASTICSEARCH_TIMEOUT', 1.0))
+ELASTICSEARCH_BULK_TIMEOUT = float(os.environ.get('ELASTICSEARCH_BULK_TIMEOUT', 30))
+ELASTICSEARCH_FAILURE_THRESHOLD = int(os.environ.get('ELASTICSEARCH_FAILURE_THRESHOLD', 3))
+ELASTICSEARCH_RESET_TIMEOUT = float(os.environ.get('ELASTICSEARCH_RESET_TIMEOUT', 30))
+
+# Search backend: elasticsearch (falling back to SEARCH_FALLBACK_BACKEND when it is down),
+# fulltext (stored search_vector) or trigram (pg_trgm fuzzy names plus full-text summary).
+# Names match when their word similarity to the query is at least SEARCH_TRIGRAM_THRESHOLD
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'elasticsearch').lower()
+SEARCH_FALLBACK_BACKEND = os.environ.get('SEARCH_FALLBACK_BACKEND', 'trigram').lower()
+SEARCH_TRIGRAM_THRESHOLD = float(os.environ.get('SEARCH_TRIGRAM_THRESHOLD', 0.5))
+# Set once per connection through the libpq startup options, not before every search
+if 'postgresql' in DATABASES['default'].get('ENGINE', ''):
+    database_options = DATABASES['default'].setdefault('OPTIONS', {})
+    database_options['options'] = (
+        f"{database_options.get('options', '')} -c pg_trgm.word_similarity_threshold={SEARCH_TRIGRAM_THRESHOLD}"
+    ).strip()
+# Seconds a search results page is cached (0 disables the search result cache)
+SEARCH_CACHE_TTL = int(os.environ.get('SEARCH_CACHE_TTL', 60))
+
+# Book and author changes are queued in the search outbox and sent to ElasticSearch by
+# `manage.py drain_search_outbox`; on by default whenever searches are served by ElasticSearch,
+# so the index cannot silently drift from the database
+SEARCH_OUTBOX_ENABLED = os.environ.get(
+    'SEARCH_OUTBOX_ENABLED', str(SEARCH_BACKEND == 'elasticsearch')
+).lower() == 'true'
+
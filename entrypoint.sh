@@ -2,4 +2,12 @@
 
 python manage.py migrate
 python manage.py loaddata fixtures/*
+python manage.py reconcile_total_sales
+python manage.py check_upvote_counts --fix
+# Fixture rows are loaded without signals, aggregate them into the stats tables
+python manage.py rebuild_stats
+# Nor are they queued in the search outbox, index them in one pass (skipped when ElasticSearch is down)
+python manage.py init_elasticsearch
+# Sends queued book changes to ElasticSearch (exits at once when the outbox is disabled)
+python manage.py drain_search_outbox --loop &
 python manage.py runserver 0.0.0.0:8000